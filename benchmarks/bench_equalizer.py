@@ -0,0 +1,71 @@
+"""
+Equalizer benchmark: an hour of 96 kHz/24-bit stereo through the DSP stage, offline.
+
+Feeds one hour of PCM through the steps the equalized playback path takes
+per block: bytes to float, Equalizer.process, float back to bytes. The CPU
+time over the audio's duration is the share of one core real-time playback
+needs; the target is under 10%. Run from the repository root:
+
+    python benchmarks/bench_equalizer.py [--seconds 3600] [--rate 96000] [--block 8192]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from equalizer import BAND_FREQUENCIES, MAX_GAIN_DB, Equalizer  # noqa: E402
+from pcm import float_to_pcm, pcm_to_float  # noqa: E402
+
+CHANNELS = 2
+SAMPLE_WIDTH = 3  # 24-bit
+
+
+def run(seconds, sample_rate, block_frames):
+    # A handful of distinct noise blocks, cycled: generating an hour of audio would dominate the timing
+    rng = np.random.default_rng(1)
+    blocks = [
+        float_to_pcm(rng.uniform(-0.25, 0.25, (block_frames, CHANNELS)).astype(np.float32), SAMPLE_WIDTH)
+        for _ in range(8)
+    ]
+    gains = np.linspace(MAX_GAIN_DB / 2, -MAX_GAIN_DB / 2, len(BAND_FREQUENCIES)).tolist()
+    equalizer = Equalizer(sample_rate, CHANNELS, gains)
+    block_count = int(seconds * sample_rate) // block_frames
+
+    stages = {'decode': 0.0, 'equalizer': 0.0, 'encode': 0.0}
+    started = time.process_time()
+    for number in range(block_count):
+        moment = time.process_time()
+        samples = pcm_to_float(blocks[number % len(blocks)], SAMPLE_WIDTH, CHANNELS)
+        decoded = time.process_time()
+        filtered = equalizer.process(samples)
+        equalized = time.process_time()
+        float_to_pcm(filtered, SAMPLE_WIDTH)
+        encoded = time.process_time()
+        stages['decode'] += decoded - moment
+        stages['equalizer'] += equalized - decoded
+        stages['encode'] += encoded - equalized
+    total = time.process_time() - started
+
+    audio_seconds = block_count * block_frames / sample_rate
+    print(f"{audio_seconds / 60:.0f} min of {sample_rate / 1000:g} kHz/{SAMPLE_WIDTH * 8}-bit stereo "
+          f"in {block_frames}-frame blocks: {total:.1f} s CPU, {100 * total / audio_seconds:.2f}% of one core, "
+          f"{audio_seconds / total:.0f}x real time")
+    for stage, stage_seconds in stages.items():
+        print(f"    {stage:<10} {stage_seconds:6.1f} s  {100 * stage_seconds / audio_seconds:5.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=3600)
+    parser.add_argument("--rate", type=int, default=96000)
+    parser.add_argument("--block", type=int, default=8192)
+    arguments = parser.parse_args()
+    run(arguments.seconds, arguments.rate, arguments.block)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Library grid resize benchmark: time per resize step and file I/O over a 5k-tile grid.
+
+Fills the main window's library with synthetic tracks whose covers are
+already decoded, then drags the window through a range of widths. The grid
+only reflows: no file may be opened, listed or parsed while resizing, which
+is checked with an audit hook on open, os.listdir and os.scandir plus a
+count of cover loads. Run from the repository root:
+
+    python benchmarks/bench_resize.py [--tracks 5000] [--steps 250]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+FILE_EVENTS = ('open', 'os.listdir', 'os.scandir', 'sqlite3.connect')
+ALBUM_SIZE = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=5000)
+    parser.add_argument("--steps", type=int, default=250)
+    arguments = parser.parse_args()
+
+    # Keep the benchmark away from the user's library and caches
+    scratch = tempfile.mkdtemp(prefix="bench_resize")
+    os.environ["XDG_DATA_HOME"] = os.path.join(scratch, "data")
+    os.environ["XDG_CACHE_HOME"] = os.path.join(scratch, "cache")
+
+    from PyQt5.QtGui import QColor, QPixmap
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    app.setApplicationName("PythonMusicPlayerBenchmark")
+    import main as player
+    from cover_cache import cover_pixmaps
+    from library_view import COVER_SIZE
+
+    window = player.MainWindow()
+    window.resize(800, 700)
+    window.show()
+    tracks = [{
+        'path': f"/music/Album {number // ALBUM_SIZE}/{number:05d}.flac", 'title': f"Track {number}",
+        'artist': f"Artist {number // 100}", 'art_hash': f"{number // ALBUM_SIZE:040x}",
+    } for number in range(arguments.tracks)]
+    cover = QPixmap(COVER_SIZE)
+    cover.fill(QColor(90, 30, 120))
+    for track in tracks[::ALBUM_SIZE]:
+        cover_pixmaps.put((track['art_hash'], COVER_SIZE.width(), COVER_SIZE.height()), cover)
+    window.trackModel.set_tracks(tracks)
+    app.processEvents()
+
+    file_events = []
+    cover_requests = []
+    sys.addaudithook(lambda event, args: file_events.append((event, args)) if event in FILE_EVENTS else None)
+    window.coverLoader.request = cover_requests.append
+
+    widths = [800 + round(1000 * step / arguments.steps) for step in range(arguments.steps)]
+    widths += widths[::-1]  # Out and back, like dragging the window edge
+    timings = []
+    for width in widths:
+        started = time.perf_counter()
+        window.resize(width, 700)
+        app.processEvents()  # Lays the grid out again and paints it
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    print(f"{arguments.tracks} tiles, {len(widths)} resize steps: "
+          f"median {timings[len(timings) // 2]:.2f} ms, max {timings[-1]:.2f} ms per step")
+    print(f"file events: {len(file_events)}, cover loads: {len(cover_requests)}")
+    for event, args in file_events[:10]:
+        print(f"    {event} {args}")
+    failed = bool(file_events or cover_requests)
+    window.close()  # Saves the session, which is file I/O of its own
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
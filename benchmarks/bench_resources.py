@@ -0,0 +1,103 @@
+"""
+Resource loading benchmark: importing a generated resources_rc module against registering utils/music.rcc.
+
+The player used to import resources_rc, a pyrcc5-generated module holding
+every icon as one bytes literal; it now registers the binary .rcc file with
+QResource.registerResource. This generates the module from utils/music.qrc
+into a scratch directory and times both ways in fresh interpreters: the
+import cold (no bytecode cached, as on the first start after an install or
+update) and warm (from the cached .pyc), and the registration. Qt itself is
+imported before the clock starts. Run from the repository root:
+
+    python benchmarks/bench_resources.py [--runs 20]
+"""
+import argparse
+import os
+import py_compile
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QRC_FILE = os.path.join(REPO_DIR, "utils", "music.qrc")
+RCC_FILE = os.path.join(REPO_DIR, "utils", "music.rcc")
+
+# Each prints the milliseconds spent on loading the resources, and checks an icon is there
+IMPORT_MODULE = """
+import sys, time
+from PyQt5.QtCore import QFile
+started = time.perf_counter()
+import resources_rc
+elapsed = time.perf_counter() - started
+assert QFile.exists(sys.argv[1])
+print(elapsed * 1000)
+"""
+REGISTER_FILE = """
+import sys, time
+from PyQt5.QtCore import QFile, QResource
+started = time.perf_counter()
+registered = QResource.registerResource(sys.argv[2])
+elapsed = time.perf_counter() - started
+assert registered and QFile.exists(sys.argv[1])
+print(elapsed * 1000)
+"""
+
+
+def first_resource(qrc_file):
+    """
+    Return the resource path of the first file listed in the .qrc, to check it's loaded.
+    """
+    from xml.etree import ElementTree
+    resource = ElementTree.parse(qrc_file).getroot().find("qresource")
+    prefix = resource.get("prefix", "/").strip("/")
+    name = resource.find("file").get("alias") or resource.find("file").text
+    return ":/" + "/".join(part for part in (prefix, name) if part)
+
+
+def time_in_fresh_interpreter(code, directory, arguments, runs, before_each=None):
+    timings = []
+    for _ in range(runs):
+        if before_each:
+            before_each()
+        output = subprocess.run(
+            [sys.executable, "-B", "-c", code, *arguments], cwd=directory, check=True, capture_output=True, text=True
+        ).stdout
+        timings.append(float(output))
+    return timings
+
+
+def report(label, timings):
+    print(f"    {label:<28} median {statistics.median(timings):7.2f} ms   min {min(timings):7.2f} ms"
+          f"   max {max(timings):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_resources") as directory:
+        module_path = os.path.join(directory, "resources_rc.py")
+        subprocess.run([sys.executable, "-m", "PyQt5.pyrcc_main", "-o", module_path, QRC_FILE], check=True)
+        bytecode_directory = os.path.join(directory, "__pycache__")
+        resource = first_resource(QRC_FILE)
+        print(f"resources_rc.py {os.path.getsize(module_path) / 1e6:.1f} MB, "
+              f"music.rcc {os.path.getsize(RCC_FILE) / 1e6:.1f} MB, checking {resource}")
+
+        def remove_bytecode():
+            shutil.rmtree(bytecode_directory, ignore_errors=True)
+
+        cold = time_in_fresh_interpreter(IMPORT_MODULE, directory, [resource], arguments.runs, remove_bytecode)
+        py_compile.compile(module_path)  # -B keeps the interpreters from writing it, but not from reading it
+        warm = time_in_fresh_interpreter(IMPORT_MODULE, directory, [resource], arguments.runs)
+        registered = time_in_fresh_interpreter(REGISTER_FILE, directory, [resource, RCC_FILE], arguments.runs)
+
+    report("import resources_rc, cold", cold)
+    report("import resources_rc, warm", warm)
+    report("registerResource music.rcc", registered)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Search index benchmark: build time, memory per track and query latency.
+
+Builds SearchIndex over synthetic libraries of 10k, 100k and 1M tracks and
+runs prefix searches (as typed into the search box), multi-word searches
+and misspelled fuzzy searches against each. The prefix searches are timed
+again together with setting their matches as the library grid's filter,
+which is what the user waits for on a keystroke. Run from the repository root:
+
+    python benchmarks/bench_search.py [--sizes 10000,100000] [--queries 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_view import TrackListModel  # noqa: E402
+from search_index import SearchIndex, tokenize  # noqa: E402
+
+SYLLABLES = ("ka", "lo", "mi", "ra", "ten", "su", "vel", "do", "ne", "rio", "an", "ber", "cha", "li", "mon", "zé",
+             "ö", "qu", "est", "ya")
+
+
+def make_words(count, rng):
+    return list({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)})
+
+
+def make_library(size, seed=1):
+    """
+    Synthetic tracks with a library's shape: a few thousand artists, ten tracks an album, a shared vocabulary.
+    """
+    rng = random.Random(seed)
+    words = make_words(max(2000, size // 20), rng)
+    artists = [" ".join(rng.sample(words, rng.randint(1, 2))).title() for _ in range(max(100, size // 100))]
+    tracks = []
+    for number in range(size):
+        if number % 10 == 0:
+            artist = rng.choice(artists)
+            album = " ".join(rng.sample(words, rng.randint(1, 3))).title()
+        tracks.append({
+            'path': f"/music/{artist}/{album}/{number:07d}.flac",
+            'title': " ".join(rng.sample(words, rng.randint(1, 5))).title(),
+            'artist': artist,
+            'album': album,
+        })
+    return tracks
+
+
+def misspell(word, rng):
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice("aeioubdkst") + word[position + 1:]
+
+
+def make_queries(tracks, count, seed=2):
+    rng = random.Random(seed)
+    prefix, words, fuzzy = [], [], []
+    for _ in range(count):
+        track = rng.choice(tracks)
+        tokens = tokenize(f"{track['artist']} {track['title']}")
+        token = rng.choice(tokens)
+        prefix.append(token[:rng.randint(1, len(token))])
+        words.append(" ".join(rng.sample(tokens, min(2, len(tokens)))))
+        fuzzy.append(misspell(max(tokens, key=len), rng))
+    return {'prefix': prefix, 'two words': words, 'misspelled': fuzzy}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def time_queries(search, queries):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def run(size, query_count):
+    tracks = make_library(size)
+
+    started = time.perf_counter()
+    index = SearchIndex()
+    index.add_tracks(tracks)
+    build_seconds = time.perf_counter() - started
+
+    # Measured on a second build, tracemalloc slows the allocations down
+    del index
+    tracemalloc.start()
+    index = SearchIndex()
+    index.add_tracks(tracks)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"{size:>9,} tracks: build {build_seconds:.2f} s, {memory / size:,.0f} bytes per track, "
+          f"{len(index.tokens):,} distinct tokens")
+    index.search(tracks[0]['artist'])  # The first search imports NumPy, a one-time cost
+    model = TrackListModel()
+    model.set_tracks(tracks)
+
+    workloads = make_queries(tracks, query_count)
+    workloads['prefix + grid'] = workloads['prefix']
+    for kind, queries in workloads.items():
+        # Typing re-runs the search for every key, so the prefix cache is cleared to measure a cold query
+        if kind == 'misspelled':
+            search = index.fuzzy_search
+        elif kind == 'prefix + grid':
+            def search(query):
+                index._prefix_cache.clear()
+                model.set_filter(index.search(query))
+        else:
+            def search(query):
+                index._prefix_cache.clear()
+                return index.search(query)
+        latencies = time_queries(search, queries)
+        print(f"    {kind:<13} p50 {percentile(latencies, 0.5):7.2f} ms   p99 {percentile(latencies, 0.99):7.2f} ms"
+              f"   max {max(latencies):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=1000)
+    arguments = parser.parse_args()
+    for size in arguments.sizes.split(","):
+        run(int(size), arguments.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Library tile benchmark: creating and painting 10k tiles.
+
+Tiles are model rows painted by TrackDelegate, so creating 10k of them is
+filling the model, and the first paint of each lays out its title and
+artist. Both are timed, and so are repaints of one screen of tiles, which
+the delegate's text cache serves. Run from the repository root:
+
+    python benchmarks/bench_tiles.py [--tiles 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QRect  # noqa: E402
+from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QStyle, QStyleOptionViewItem  # noqa: E402
+
+from library_view import COVER_SIZE, TILE_SIZE, TrackDelegate, TrackListModel  # noqa: E402
+
+VISIBLE_TILES = 40  # One screen of the grid at 1920x1080
+
+
+def best_of(repeat, function):
+    # CPU time, so other processes on the machine don't show up in it
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        function()
+        timings.append(time.process_time() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tiles", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args()
+
+    app = QApplication(sys.argv)  # noqa: F841, painting text needs one
+    tracks = [{
+        'path': f"/music/{number}.flac", 'title': f"Song number {number} with a fairly long title",
+        'artist': f"Artist {number % 500}", 'art_hash': None,
+    } for number in range(arguments.tiles)]
+    cover = QPixmap(COVER_SIZE)
+    cover.fill(QColor(90, 30, 120))
+    image = QImage(TILE_SIZE, QImage.Format_ARGB32_Premultiplied)
+    option = QStyleOptionViewItem()
+    option.rect = QRect(0, 0, TILE_SIZE.width(), TILE_SIZE.height())
+    option.state = QStyle.State_Enabled
+    model = TrackListModel()
+
+    def create():
+        model.set_tracks(tracks)
+
+    def paint(rows, delegate):
+        painter = QPainter(image)
+        for row in rows:
+            delegate.paint(painter, option, model.index(row))
+        painter.end()
+
+    def first_paint():
+        paint(range(arguments.tiles), TrackDelegate(lambda art_hash: cover))  # A new delegate has no texts cached
+
+    screen = TrackDelegate(lambda art_hash: cover)
+    paint(range(VISIBLE_TILES), screen)
+
+    def repaint_screen():
+        for _ in range(arguments.tiles // VISIBLE_TILES):
+            paint(range(VISIBLE_TILES), screen)
+
+    print(f"{arguments.tiles} tiles, best of {arguments.repeat}:")
+    print(f"    create (fill the model)        {best_of(arguments.repeat, create):8.1f} ms")
+    print(f"    first paint of every tile      {best_of(arguments.repeat, first_paint):8.1f} ms")
+    print(f"    as many repaints of one screen {best_of(arguments.repeat, repaint_screen):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compile utils/music.qrc into the binary resource file utils/music.rcc.
+
+The player registers the .rcc at runtime with QResource.registerResource, which
+memory-maps it, instead of importing a generated Python module holding every
+icon as a bytes literal. Run this after changing anything listed in the .qrc:
+
+    python build_resources.py
+"""
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+QRC_FILE = os.path.join(BASE_DIR, "utils", "music.qrc")
+RCC_FILE = os.path.join(BASE_DIR, "utils", "music.rcc")
+
+RCC_FORMAT_VERSION = 2
+HEADER_SIZE = 20  # "qres" magic, format version, then tree, data and names offsets
+
+
+def compile_sections(qrc_file):
+    """
+    Run pyrcc5 and return the (tree, names, data) sections it generated.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        module_path = os.path.join(directory, "compiled_rc.py")
+        subprocess.run([sys.executable, "-m", "PyQt5.pyrcc_main", "-o", module_path, qrc_file], check=True)
+        namespace = {}
+        with open(module_path) as module:
+            source = module.read()
+        # Only the data definitions are needed, not the registration at the bottom
+        exec(source[:source.index("qt_version = ")], namespace)
+    return namespace["qt_resource_struct_v2"], namespace["qt_resource_name"], namespace["qt_resource_data"]
+
+
+def write_rcc(rcc_file, tree, names, data):
+    data_offset = HEADER_SIZE
+    names_offset = data_offset + len(data)
+    tree_offset = names_offset + len(names)
+    with open(rcc_file, "wb") as output:
+        output.write(b"qres")
+        output.write(struct.pack(">IIII", RCC_FORMAT_VERSION, tree_offset, data_offset, names_offset))
+        output.write(data)
+        output.write(names)
+        output.write(tree)
+
+
+if __name__ == "__main__":
+    write_rcc(RCC_FILE, *compile_sections(QRC_FILE))
+    print(f"Wrote {RCC_FILE}")
@@ -0,0 +1,206 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject, QRunnable, Qt, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from library_index import TrackIndex
+from paths import user_data_dir
+
+
+def decode_scaled(image_data, size):
+    """
+    Decode image bytes straight to an image that fits size, keeping the aspect ratio.
+
+    The reader scales while decoding (JPEG covers are downsampled in the DCT),
+    which is much cheaper than decoding at full size and scaling afterwards.
+    Returns a null QImage if the data can't be decoded.
+    """
+    buffer = QBuffer()
+    buffer.setData(QByteArray(image_data))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    original_size = reader.size()
+    if original_size.isValid():
+        reader.setScaledSize(original_size.scaled(size, Qt.KeepAspectRatio))
+    return reader.read()
+
+
+class ThumbnailCache:
+    """
+    Content-addressed on-disk cache of album art pre-scaled to tile size.
+
+    Thumbnails are keyed by the hash of the embedded picture bytes, so every
+    track sharing a cover shares one file, and a full size cover is decoded
+    and scaled once per unique picture.
+    """
+
+    def __init__(self, size, directory=None):
+        self.size = size
+        if directory is None:
+            directory = os.path.join(user_data_dir(), "thumbnails", f"{size.width()}x{size.height()}")
+        self.directory = directory
+
+    def path(self, art_hash):
+        # Two-level fan-out keeps directories small for big libraries
+        return os.path.join(self.directory, art_hash[:2], f"{art_hash}.jpg")
+
+    def load(self, art_hash):
+        """
+        Return the cached thumbnail for art_hash as a QImage, or None.
+        """
+        path = self.path(art_hash)
+        if not os.path.exists(path):
+            return None
+        image = QImage(path)
+        return None if image.isNull() else image
+
+    def store(self, art_hash, image_data):
+        """
+        Scale the full cover to tile size, save it and return the thumbnail (None if undecodable).
+        """
+        thumbnail = decode_scaled(image_data, self.size)
+        if thumbnail.isNull():
+            return None
+
+        path = self.path(art_hash)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write under a temporary name so a crash never leaves a truncated thumbnail behind
+            temporary_path = f"{path}.tmp"
+            if thumbnail.save(temporary_path, "JPG", 90):
+                os.replace(temporary_path, path)
+        except OSError as e:
+            print(f"Error caching thumbnail: {e}")
+        return thumbnail
+
+
+class _CoverTask(QRunnable):
+    def __init__(self, loader, art_hash):
+        super(_CoverTask, self).__init__()
+        self.loader = loader
+        self.art_hash = art_hash
+
+    def run(self):
+        self.loader.load(self.art_hash)
+
+
+class CoverLoader(QObject):
+    """
+    Produces tile-sized cover images on worker threads.
+
+    Covers come from the thumbnail cache, or are decoded from the index at tile
+    size. The result is handed back as a QImage through coverReady (a null image
+    if the cover couldn't be decoded); turning it into a QPixmap is left to the
+    GUI thread. The most recent requests are served first, so the tiles that
+    are on screen after a fast scroll don't wait behind the ones scrolled past.
+    """
+    coverReady = pyqtSignal(str, QImage)
+
+    def __init__(self, thumbnail_cache, db_path, parent=None):
+        super(CoverLoader, self).__init__(parent)
+        self.thumbnail_cache = thumbnail_cache
+        self.db_path = db_path
+        self.pool = QThreadPool.globalInstance()
+        self._pending = set()
+        self._priority = 0
+        self._local = threading.local()
+        self.coverReady.connect(self._finished)
+
+    def request(self, art_hash):
+        if art_hash in self._pending:
+            return
+        self._pending.add(art_hash)
+        self._priority += 1
+        self.pool.start(_CoverTask(self, art_hash), self._priority)
+
+    def load(self, art_hash):
+        # Runs on a pool thread; sqlite connections can't be shared across threads
+        image = None
+        try:
+            image = self.thumbnail_cache.load(art_hash)
+            if image is None:
+                if not hasattr(self._local, 'index'):
+                    self._local.index = TrackIndex(self.db_path)
+                cover_data = self._local.index.cover_data(art_hash)
+                image = self.thumbnail_cache.store(art_hash, cover_data) if cover_data else None
+        except Exception as e:
+            print(f"Error loading cover: {e}")
+        self.coverReady.emit(art_hash, image if image is not None else QImage())
+
+    def _finished(self, art_hash, image):
+        self._pending.discard(art_hash)
+
+
+def pixmap_cost(pixmap):
+    """
+    Approximate memory held by a pixmap, in bytes.
+    """
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class CoverPixmapCache:
+    """
+    In-memory LRU cache of decoded cover pixmaps with a budget in bytes.
+
+    Keys are built from the art hash (plus the size the pixmap was scaled
+    to), so every track of an album shares one pixmap. Least recently used
+    entries are evicted once the total cost exceeds the budget.
+    """
+
+    def __init__(self, budget_bytes=64 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (pixmap, cost), oldest first
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, pixmap):
+        cost = pixmap_cost(pixmap)
+        if cost > self.budget_bytes:
+            return  # Would evict everything else and still not fit
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.used_bytes -= old[1]
+        self._entries[key] = (pixmap, cost)
+        self.used_bytes += cost
+        self._evict()
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._evict()
+
+    def clear(self):
+        self._entries.clear()
+        self.used_bytes = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'used_bytes': self.used_bytes,
+            'budget_bytes': self.budget_bytes,
+        }
+
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and self._entries:
+            _, (_, cost) = self._entries.popitem(last=False)
+            self.used_bytes -= cost
+            self.evictions += 1
+
+
+# Process-wide cache shared by the library grid and the now-playing bar
+cover_pixmaps = CoverPixmapCache()
@@ -0,0 +1,126 @@
+import os
+import sqlite3
+
+from paths import user_data_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    duration REAL,
+    format TEXT,
+    art_hash TEXT,
+    loudness REAL,
+    true_peak REAL,
+    album_loudness REAL,
+    album_peak REAL,
+    loudness_failed INTEGER
+);
+CREATE TABLE IF NOT EXISTS covers (
+    art_hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+# Measured by the loudness analyzer after a track is indexed: integrated loudness
+# in LUFS and linear true peak, of the track and of its album
+LOUDNESS_COLUMNS = ('loudness', 'true_peak', 'album_loudness', 'album_peak')
+
+TRACK_COLUMNS = (
+    'path', 'mtime', 'size', 'title', 'artist', 'album', 'duration', 'format', 'art_hash'
+) + LOUDNESS_COLUMNS + ('loudness_failed',)
+
+# Columns added after the first release, with their types
+ADDED_COLUMNS = {column: 'REAL' for column in LOUDNESS_COLUMNS}
+ADDED_COLUMNS['loudness_failed'] = 'INTEGER'  # Set when the file couldn't be measured, cleared by storing it again
+
+
+class TrackIndex:
+    """
+    Persistent track metadata index keyed by (path, mtime, size).
+
+    A track is only parsed again when its modification time or size differ
+    from the stored row, so an unchanged library is served from the index
+    without opening any audio file.
+    """
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(user_data_dir(), "library.db")
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        # Indexes created before loudness analysis lack its columns
+        existing = {row['name'] for row in self.connection.execute("PRAGMA table_info(tracks)")}
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE tracks ADD COLUMN {column} {column_type}")
+        self.connection.commit()
+
+    def track(self, path):
+        """
+        Return the stored track for path regardless of freshness, or None.
+        """
+        row = self.connection.execute("SELECT * FROM tracks WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else None
+
+    def tracks_in(self, folder_path):
+        """
+        Return {path: track} for every indexed track below folder_path.
+        """
+        prefix = os.path.join(folder_path, '')
+        rows = self.connection.execute(
+            "SELECT * FROM tracks WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+        )
+        return {row['path']: dict(row) for row in rows}
+
+    def store(self, track):
+        """
+        Insert or replace a track record; embedded art is stored once per hash.
+        """
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO tracks ({', '.join(TRACK_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(TRACK_COLUMNS))})",
+            tuple(track.get(column) for column in TRACK_COLUMNS),  # Freshly parsed tracks aren't measured yet
+        )
+        if track.get('art_hash') and track.get('art'):
+            self.connection.execute(
+                "INSERT OR IGNORE INTO covers (art_hash, data) VALUES (?, ?)", (track['art_hash'], track['art'])
+            )
+
+    def store_loudness(self, results):
+        """
+        Store loudness measurements, dicts with path, mtime, size and LOUDNESS_COLUMNS or loudness_failed.
+
+        A measurement of a file that has changed since it was read is dropped,
+        and so is a failure: the changed file is measured again.
+        """
+        columns = LOUDNESS_COLUMNS + ('loudness_failed',)
+        self.connection.executemany(
+            f"UPDATE tracks SET {', '.join(f'{column} = ?' for column in columns)} "
+            "WHERE path = ? AND mtime = ? AND size = ?",
+            (tuple(result.get(column) for column in columns + ('path', 'mtime', 'size')) for result in results),
+        )
+
+    def remove(self, paths):
+        self.connection.executemany("DELETE FROM tracks WHERE path = ?", ((path,) for path in paths))
+
+    def cover_data(self, art_hash):
+        row = self.connection.execute("SELECT data FROM covers WHERE art_hash = ?", (art_hash,)).fetchone()
+        return row['data'] if row else None
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
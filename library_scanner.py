@@ -0,0 +1,309 @@
+import collections
+import os
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from metadata import read_track
+
+SUPPORTED_FORMATS = ('.mp3', '.flac', '.wav', '.m4a')
+
+# Directory names that never hold a user's music (OS metadata, NAS thumbnails, trash)
+EXCLUDED_DIRS = frozenset({'__MACOSX', '@eaDir', '$RECYCLE.BIN', 'System Volume Information', 'lost+found'})
+
+
+def directory_key(stat):
+    return stat.st_dev, stat.st_ino
+
+
+def iter_audio_files(root, excluded_dirs=EXCLUDED_DIRS, include_hidden=False, visited=None):
+    """
+    Lazily yield (path, stat) for every supported audio file below root.
+
+    The tree is walked with os.scandir, so file type checks come from the
+    directory entries and each file is stat'ed exactly once. Symlinked
+    directories are followed, but every directory is entered only once
+    (keyed by device and inode), which breaks symlink cycles. Walks of parts
+    of the same library share the visited set, so a link back into an
+    already known directory isn't followed either.
+    """
+    try:
+        root_stat = os.stat(root)
+    except OSError as e:
+        print(f"Error scanning folder: {e}")
+        return
+    if visited is None:
+        visited = set()
+    visited.add(directory_key(root_stat))
+    pending = [root]
+
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirectories = []
+                for entry in entries:
+                    if not include_hidden and entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            if entry.name in excluded_dirs:
+                                continue
+                            key = directory_key(entry.stat())
+                            if key not in visited:
+                                visited.add(key)
+                                subdirectories.append(entry.path)
+                        elif entry.name.lower().endswith(SUPPORTED_FORMATS) and entry.is_file():
+                            yield entry.path, entry.stat()
+                    except OSError as e:
+                        print(f"Error scanning {entry.path}: {e}")
+        except OSError as e:
+            print(f"Error scanning folder: {e}")
+            continue
+
+        # Reversed so the stack visits subdirectories in listing order
+        pending.extend(reversed(subdirectories))
+
+
+class LibraryScanner(QObject):
+    """
+    Scans a folder tree off the GUI thread and streams track records back in batches.
+
+    Files that are unchanged in the index are passed through as-is; everything
+    else is parsed in a process pool so tag parsing scales with the number of
+    cores. Tracks are delivered in the order the walk found them: a track
+    waits for the parses in flight ahead of it, however the pool finishes
+    them. Batches are delivered through queued signals tagged with the scan id,
+    so results of a cancelled scan can be told apart from the current one.
+
+    A scan that stops on an error still finishes, flagged as incomplete, so
+    its tracks aren't taken as the whole library. If the error is a broken
+    pool (a worker died), the pool is dropped and the next scan starts a new one.
+    """
+    tracksReady = pyqtSignal(int, list)  # scan id, batch of track records
+    scanProgress = pyqtSignal(int, int, float)  # scan id, files found so far, files per second
+    scanFinished = pyqtSignal(int, bool)  # scan id, whether every file of the tree was delivered
+    libraryChanged = pyqtSignal(int, list, list)  # scan id, added or updated track records, removed paths
+
+    def __init__(self, parent=None, max_workers=None, batch_size=256, flush_interval=0.2):
+        super(LibraryScanner, self).__init__(parent)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # Seconds a partial batch may wait before it's delivered
+        self.scan_id = 0
+        self._executor = None
+        self._executor_lock = threading.Lock()  # Scan and rescan threads can ask for the pool at the same time
+        self._cancelled = threading.Event()
+
+    def executor(self):
+        # Spawned workers don't inherit the Qt state of the GUI process
+        with self._executor_lock:
+            if self._executor is None:
+                # Imported here, the pool machinery isn't needed until the first scan
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def scan(self, folder_path, known_tracks):
+        """
+        Start scanning folder_path, cancelling any scan that is still running.
+
+        known_tracks maps paths to the records currently stored in the index.
+        Returns the id of the new scan.
+        """
+        self.cancel()
+        self.scan_id += 1
+        self._cancelled = threading.Event()
+        thread = threading.Thread(
+            target=self._run, args=(self.scan_id, folder_path, known_tracks, self._cancelled), daemon=True
+        )
+        thread.start()
+        return self.scan_id
+
+    def rescan(self, directories, known_tracks, watched_directories):
+        """
+        Work out what changed in directories and report it as one libraryChanged batch.
+
+        Only the direct contents of each changed directory are listed, plus any
+        subdirectory that isn't watched yet (a folder that was just copied or
+        renamed in). Runs under the current scan id, so a full scan started in
+        the meantime supersedes it.
+        """
+        thread = threading.Thread(
+            target=self._run_rescan,
+            args=(self.scan_id, directories, known_tracks, watched_directories, self._cancelled),
+            daemon=True,
+        )
+        thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @staticmethod
+    def _directory_keys(directories):
+        keys = set()
+        for directory in directories:
+            try:
+                keys.add(directory_key(os.stat(directory)))
+            except OSError:
+                pass  # Removed in the meantime
+        return keys
+
+    def shutdown(self):
+        self.cancel()
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _discard_broken_executor(self, executor, error):
+        # Only a broken pool is dropped, and only if no other thread has replaced it yet
+        from concurrent.futures.process import BrokenProcessPool
+        if executor is None or not isinstance(error, BrokenProcessPool):
+            return
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _is_pool_error(error):
+        # Errors of the pool rather than of the track, every parse after it fails the same way
+        from concurrent.futures import CancelledError
+        from concurrent.futures.process import BrokenProcessPool
+        return isinstance(error, (BrokenProcessPool, CancelledError))
+
+    def _run(self, scan_id, folder_path, known_tracks, cancelled):
+        batch = []
+        executor = None
+        complete = False
+        pending = collections.deque()  # Track records and futures of parses, in walk order
+        last_flush = time.monotonic()
+
+        def flush():
+            nonlocal last_flush
+            if batch and not cancelled.is_set():
+                self.tracksReady.emit(scan_id, list(batch))
+            batch.clear()
+            last_flush = time.monotonic()
+
+        def add(track):
+            batch.append(track)
+            if len(batch) >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval:
+                flush()
+
+        def deliver(wait):
+            # Pass on the tracks at the head of pending, waiting for their parses only if asked to
+            while pending and not cancelled.is_set():
+                head = pending[0]
+                if isinstance(head, dict):
+                    add(head)
+                elif wait or head.done():
+                    try:
+                        add(head.result())
+                    except Exception as e:
+                        if self._is_pool_error(e):
+                            raise
+                        print(f"Error indexing track: {e}")
+                else:
+                    return
+                pending.popleft()
+
+        started = last_progress = time.monotonic()
+        found = 0
+
+        try:
+            for file_path, stat in iter_audio_files(folder_path):
+                if cancelled.is_set():
+                    return
+                found += 1
+                now = time.monotonic()
+                if now - last_progress >= 0.5:
+                    self.scanProgress.emit(scan_id, found, found / (now - started))
+                    last_progress = now
+
+                track = known_tracks.get(file_path)
+                if track and track['mtime'] == stat.st_mtime_ns and track['size'] == stat.st_size:
+                    pending.append(track)
+                else:
+                    executor = executor or self.executor()
+                    pending.append(executor.submit(read_track, file_path, stat.st_mtime_ns, stat.st_size))
+                deliver(wait=False)
+            flush()
+            elapsed = time.monotonic() - started
+            self.scanProgress.emit(scan_id, found, found / elapsed if elapsed > 0 else 0.0)
+
+            deliver(wait=True)
+            if cancelled.is_set():
+                for future in pending:
+                    if not isinstance(future, dict):
+                        future.cancel()
+                return
+            flush()
+            complete = True
+        except Exception as e:
+            print(f"Error scanning folder: {e}")
+            self._discard_broken_executor(executor, e)
+            flush()  # What was found so far is still good
+
+        if not cancelled.is_set():
+            self.scanFinished.emit(scan_id, complete)
+
+    def _run_rescan(self, scan_id, directories, known_tracks, watched_directories, cancelled):
+        present = {}
+        missing = []
+        visited = None  # Directories already in the library, only worked out once a new subdirectory shows up
+        executor = None
+        try:
+            for directory in directories:
+                if not os.path.isdir(directory):
+                    missing.append(os.path.join(directory, ''))
+                    continue
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir():
+                            if entry.path not in watched_directories and entry.name not in EXCLUDED_DIRS:
+                                if visited is None:
+                                    visited = self._directory_keys(watched_directories)
+                                # A link back into the library (e.g. to its root) is already indexed
+                                if directory_key(entry.stat()) not in visited:
+                                    present.update(iter_audio_files(entry.path, visited=visited))
+                        elif entry.name.lower().endswith(SUPPORTED_FORMATS) and entry.is_file():
+                            present[entry.path] = entry.stat()
+
+            changed_directories = set(directories)
+            removed = [
+                path for path in known_tracks
+                if path not in present and (
+                    os.path.dirname(path) in changed_directories or path.startswith(tuple(missing))
+                )
+            ]
+
+            futures = []
+            for file_path, stat in present.items():
+                track = known_tracks.get(file_path)
+                if not (track and track['mtime'] == stat.st_mtime_ns and track['size'] == stat.st_size):
+                    executor = executor or self.executor()
+                    futures.append(executor.submit(read_track, file_path, stat.st_mtime_ns, stat.st_size))
+
+            updated = []
+            for future in futures:  # In listing order, like a full scan
+                if cancelled.is_set():
+                    return
+                try:
+                    updated.append(future.result())
+                except Exception as e:
+                    if self._is_pool_error(e):
+                        raise
+                    print(f"Error indexing track: {e}")
+        except Exception as e:
+            print(f"Error rescanning folders: {e}")
+            self._discard_broken_executor(executor, e)
+            return
+
+        if (updated or removed) and not cancelled.is_set():
+            self.libraryChanged.emit(scan_id, updated, removed)
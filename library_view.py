@@ -0,0 +1,236 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QRect, QRectF, QSize, Qt
+from PyQt5.QtGui import QBrush, QColor, QFont, QFontMetrics, QPainter, QPainterPath, QPen, QStaticText
+from PyQt5.QtWidgets import QStyle, QStyledItemDelegate
+
+TILE_SIZE = QSize(200, 200)
+COVER_SIZE = QSize(200, 150)
+GRID_SIZE = QSize(212, 212)  # Tile plus spacing
+TEXT_CACHE_SIZE = 1024  # Laid out tile texts kept by the delegate, a few screens' worth
+
+
+class TrackListModel(QAbstractListModel):
+    """
+    Flat list model of library tracks, one row per visible track record.
+
+    all_tracks holds every track in library order; tracks holds the rows
+    currently shown, which is the same list unless a filter is set. Search
+    matches hand over their rows in library order; for a ranked list of
+    paths, the library position of every path is kept, so its rows are
+    looked up rather than the library scanned for them.
+    """
+    PathRole = Qt.UserRole + 1
+    ArtistRole = Qt.UserRole + 2
+    ArtHashRole = Qt.UserRole + 3
+
+    def __init__(self, parent=None):
+        super(TrackListModel, self).__init__(parent)
+        self.all_tracks = []
+        self.tracks = self.all_tracks
+        self.filter = None  # Search matches, a dict of paths in ranked order, or None for all
+        self._positions = {}  # Path -> index in all_tracks
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tracks)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        track = self.tracks[index.row()]
+        if role == Qt.DisplayRole:
+            return track['title']
+        if role == self.ArtistRole:
+            return track['artist']
+        if role == self.PathRole:
+            return track['path']
+        if role == self.ArtHashRole:
+            return track['art_hash']
+        if role == Qt.ToolTipRole:
+            return f"{track['title']} - {track['artist']}"
+        return None
+
+    def set_tracks(self, tracks):
+        self.beginResetModel()
+        self.all_tracks = list(tracks)
+        self._positions = positions = {track['path']: position for position, track in enumerate(self.all_tracks)}
+        self.tracks = self._visible()
+        if self.filter is not None and not isinstance(self.filter, dict):
+            # Matches found before the library changed, keep this library's records of the ones still in it
+            self.tracks = [
+                self.all_tracks[positions[track['path']]] for track in self.tracks if track['path'] in positions
+            ]
+        self.endResetModel()
+
+    def set_filter(self, paths):
+        """
+        Only show tracks whose path is in paths; None shows every track.
+
+        paths is either SearchIndex.search matches, shown in library order,
+        or a list of paths, shown in the list's order.
+        """
+        if paths is None and self.filter is None:
+            return
+        self.beginResetModel()
+        if isinstance(paths, list):
+            paths = {path: rank for rank, path in enumerate(paths)}
+        self.filter = paths
+        self.tracks = self._visible()
+        self.endResetModel()
+
+    def append_tracks(self, tracks):
+        for position, track in enumerate(tracks, len(self.all_tracks)):
+            self._positions[track['path']] = position
+        if self.filter is not None:
+            self.all_tracks.extend(tracks)
+            tracks = self._filtered(tracks)
+        if not tracks:
+            return
+        first = len(self.tracks)
+        self.beginInsertRows(QModelIndex(), first, first + len(tracks) - 1)
+        self.tracks.extend(tracks)
+        self.endInsertRows()
+
+    def apply_changes(self, updated, removed):
+        """
+        Update rows in place, append new tracks and drop removed paths.
+        """
+        if self.filter is not None:
+            # Rare enough while searching to just rebuild the visible rows
+            changed = {track['path']: track for track in updated}
+            removed = set(removed)
+            kept = [changed.pop(track['path'], track) for track in self.all_tracks if track['path'] not in removed]
+            self.set_tracks(kept + list(changed.values()))
+            return
+
+        # Unfiltered, the rows are all_tracks and a path's row is its position
+        rows = self._positions
+        for row in sorted((rows[path] for path in removed if path in rows), reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.tracks[row]
+            self.endRemoveRows()
+        if removed:
+            self._positions = rows = {track['path']: row for row, track in enumerate(self.tracks)}
+
+        added = []
+        for track in updated:
+            row = rows.get(track['path'])
+            if row is None:
+                added.append(track)
+            else:
+                self.tracks[row] = track
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+        self.append_tracks(added)
+
+    def track(self, row):
+        return self.tracks[row]
+
+    def _visible(self):
+        if self.filter is None:
+            return self.all_tracks
+        if isinstance(self.filter, dict):
+            # Built from the ranked list, so the keys are already in rank order
+            positions = self._positions
+            return [self.all_tracks[positions[path]] for path in self.filter if path in positions]
+        return self.filter.tracks()
+
+    def _filtered(self, tracks):
+        if self.filter is None:
+            return tracks
+        visible = [track for track in tracks if track['path'] in self.filter]
+        if isinstance(self.filter, dict):
+            visible.sort(key=lambda track: self.filter[track['path']])
+        return visible
+
+
+class TrackDelegate(QStyledItemDelegate):
+    """
+    Paints a library tile (cover, title and artist) directly, without per-track widgets.
+
+    cover_provider is called with the track's art hash (or None) and must return
+    a QPixmap already scaled to fit COVER_SIZE, or None while the cover is still
+    loading, in which case a placeholder is painted.
+
+    Brushes, pens, fonts and the tile outline are built once. Titles and
+    artists are elided and laid out once into QStaticText objects, kept in a
+    small LRU cache, so scrolling back and forth doesn't shape them again.
+    """
+
+    def __init__(self, cover_provider, parent=None):
+        super(TrackDelegate, self).__init__(parent)
+        self.cover_provider = cover_provider
+
+        self.background = QBrush(QColor(45, 49, 48))
+        self.hoverBackground = QBrush(QColor(60, 65, 64))
+        self.placeholder = QBrush(QColor(70, 76, 75))
+        self.titlePen = QPen(QColor(Qt.white))
+        self.artistPen = QPen(QColor(Qt.lightGray))
+
+        self.titleFont = QFont()
+        self.titleFont.setPixelSize(14)
+        self.titleFont.setBold(True)
+        self.artistFont = QFont()
+        self.artistFont.setPixelSize(12)
+
+        self.outline = QPainterPath()
+        self.outline.addRoundedRect(QRectF(0, 0, TILE_SIZE.width(), TILE_SIZE.height()), 10, 10)
+        self._texts = OrderedDict()  # (text, font, width) -> QStaticText
+
+    def static_text(self, text, font, width):
+        key = (text, font is self.titleFont, width)
+        static_text = self._texts.get(key)
+        if static_text is None:
+            static_text = QStaticText(QFontMetrics(font).elidedText(text, Qt.ElideRight, width))
+            static_text.setTextFormat(Qt.PlainText)
+            static_text.prepare(font=font)
+            self._texts[key] = static_text
+            if len(self._texts) > TEXT_CACHE_SIZE:
+                self._texts.popitem(last=False)
+        else:
+            self._texts.move_to_end(key)
+        return static_text
+
+    def draw_text(self, painter, rect, text, font, pen):
+        static_text = self.static_text(text, font, rect.width())
+        size = static_text.size()
+        painter.setFont(font)
+        painter.setPen(pen)
+        # Centered in rect, like drawText with Qt.AlignCenter
+        painter.drawStaticText(
+            round(rect.x() + (rect.width() - size.width()) / 2),
+            round(rect.y() + (rect.height() - size.height()) / 2),
+            static_text,
+        )
+
+    def sizeHint(self, option, index):
+        return TILE_SIZE
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        rect = QRect(option.rect.topLeft(), TILE_SIZE)
+        path = self.outline.translated(rect.x(), rect.y())
+        hovered = option.state & QStyle.State_MouseOver
+        painter.fillPath(path, self.hoverBackground if hovered else self.background)
+
+        cover = self.cover_provider(index.data(TrackListModel.ArtHashRole))
+        cover_rect = QRect(rect.topLeft(), COVER_SIZE)
+        painter.setClipPath(path)
+        if cover is None:
+            painter.fillRect(cover_rect, self.placeholder)
+        else:
+            x = cover_rect.x() + (cover_rect.width() - cover.width()) // 2
+            y = cover_rect.y() + (cover_rect.height() - cover.height()) // 2
+            painter.drawPixmap(x, y, cover)
+        painter.setClipping(False)
+
+        text_rect = rect.adjusted(10, COVER_SIZE.height(), -10, 0)
+        title_rect = QRect(text_rect.x(), text_rect.y(), text_rect.width(), text_rect.height() // 2)
+        artist_rect = QRect(text_rect.x(), title_rect.bottom(), text_rect.width(), text_rect.height() // 2)
+
+        self.draw_text(painter, title_rect, index.data(Qt.DisplayRole), self.titleFont, self.titlePen)
+        self.draw_text(painter, artist_rect, index.data(TrackListModel.ArtistRole), self.artistFont, self.artistPen)
+
+        painter.restore()
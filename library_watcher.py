@@ -0,0 +1,103 @@
+import os
+import time
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+
+class LibraryWatcher(QObject):
+    """
+    Watches the directories of a library root and reports changes in coalesced batches.
+
+    Every directory that holds tracks (and each directory between it and the
+    root) is watched, so added, removed and renamed files and folders are
+    noticed. Change notifications are collected until the tree has been quiet
+    for settle_ms, or for at most max_delay_ms, so a burst such as copying a
+    whole album is reported as a single batch.
+
+    Rewriting a file in place, as tag editors do, doesn't change its
+    directory and goes unnoticed by the watcher, so while a tree is watched
+    recheckDue is also emitted every recheck_ms, for the files to be
+    compared with the index by their modification time and size. The
+    recheck covers every directory of the tree even where the system
+    refused to watch it (e.g. past the inotify watch limit).
+    """
+    directoriesChanged = pyqtSignal(list)
+    recheckDue = pyqtSignal()
+
+    def __init__(self, parent=None, settle_ms=500, max_delay_ms=3000, recheck_ms=60000):
+        super(LibraryWatcher, self).__init__(parent)
+        self.root = None
+        self.max_delay = max_delay_ms / 1000
+        self._directories = set()  # Every directory of the tree, whether or not the watch on it took
+        self._pending = set()
+        self._first_change = None
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._directory_changed)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(settle_ms)
+        self._timer.timeout.connect(self._flush)
+
+        self._recheck_timer = QTimer(self)
+        self._recheck_timer.setInterval(recheck_ms)
+        self._recheck_timer.timeout.connect(self.recheckDue)
+
+    def watch(self, root, track_paths):
+        """
+        Replace the watched tree with root and the directories holding track_paths.
+        """
+        self.clear()
+        self.root = root
+        self.add_tracks(track_paths)
+        self._recheck_timer.start()
+
+    def add_tracks(self, track_paths):
+        """
+        Start watching the directories of newly found tracks.
+        """
+        if self.root is None:
+            return
+        directories = {self.root}
+        prefix = os.path.join(self.root, '')
+        for path in track_paths:
+            directory = os.path.dirname(path)
+            while directory.startswith(prefix) and directory not in directories:
+                directories.add(directory)
+                directory = os.path.dirname(directory)
+
+        new_directories = directories.difference(self._directories)
+        if new_directories:
+            self._directories.update(new_directories)
+            self._watcher.addPaths(sorted(new_directories))
+
+    def directories(self):
+        return set(self._directories)
+
+    def clear(self):
+        watched = self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._directories.clear()
+        self._timer.stop()
+        self._recheck_timer.stop()
+        self._pending.clear()
+        self._first_change = None
+        self.root = None
+
+    def _directory_changed(self, path):
+        self._pending.add(path)
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        # Keep waiting while changes are still arriving, but never past max_delay
+        if now - self._first_change < self.max_delay:
+            self._timer.start()
+
+    def _flush(self):
+        changed = sorted(self._pending)
+        self._pending.clear()
+        self._first_change = None
+        if changed:
+            self.directoriesChanged.emit(changed)
@@ -0,0 +1,164 @@
+import math
+
+import numpy as np
+
+from equalizer import cascade_response
+from pcm_decoder import decode
+
+ANALYSIS_SAMPLE_RATE = 48000  # The rate the K-weighting filter is specified at
+ABSOLUTE_GATE = -70.0  # LUFS
+RELATIVE_GATE = -10.0  # LU below the loudness of the blocks that pass the absolute gate
+BLOCK_SECONDS = 0.4
+HOPS_PER_BLOCK = 4  # Gating blocks overlap by 75%, so they're sums of four 100 ms hops
+OVERSAMPLING = 4  # For the true peak
+INTERPOLATION_TAPS = 12  # Per phase of the oversampling filter
+
+# Weight of each channel in the loudness sum; the LFE channel of 5.1 isn't counted
+CHANNEL_WEIGHTS = {6: (1.0, 1.0, 1.0, 0.0, 1.41, 1.41)}
+
+
+def k_weighting_sections(sample_rate):
+    """
+    Return the two biquads of the ITU-R BS.1770 K-weighting filter at sample_rate, as (b0, b1, b2, a1, a2).
+
+    The standard gives the coefficients at 48 kHz only; they are derived here
+    from the underlying high shelf and high-pass, which reproduces them at
+    48 kHz and carries the same response over to other rates.
+    """
+    # High shelf modelling the acoustic effect of the head
+    k = math.tan(math.pi * 1681.974450955533 / sample_rate)
+    q = 0.7071752369554196
+    vh = 10.0 ** (3.999843853973347 / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = (
+        (vh + vb * k / q + k * k) / a0,
+        2.0 * (k * k - vh) / a0,
+        (vh - vb * k / q + k * k) / a0,
+        2.0 * (k * k - 1.0) / a0,
+        (1.0 - k / q + k * k) / a0,
+    )
+
+    # RLB high-pass, the ear's falling sensitivity to low frequencies
+    k = math.tan(math.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1.0 + k / q + k * k
+    high_pass = (1.0, -2.0, 1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0)
+    return shelf, high_pass
+
+
+def gated_loudness(block_energies):
+    """
+    Integrated loudness in LUFS of the gating block energies (mean squares), or None if all are gated out.
+
+    Blocks of several tracks can be passed together to get their joint (album) loudness.
+    """
+    energies = np.asarray(block_energies, dtype=np.float64)
+    energies = energies[energies > 10.0 ** ((ABSOLUTE_GATE + 0.691) / 10.0)]
+    if not len(energies):
+        return None
+    # RELATIVE_GATE below the loudness of these blocks; in energy, the -0.691 offset cancels out
+    relative_gate = 10.0 ** (RELATIVE_GATE / 10.0) * energies.mean()
+    energies = energies[energies > relative_gate]
+    return -0.691 + 10.0 * math.log10(energies.mean())
+
+
+class LoudnessMeter:
+    """
+    EBU R128 meter over blocks of float PCM, shape (frames, channels).
+
+    The K-weighting cascade is applied the same way as the equalizer, as a
+    FIR cut from its frequency response and run with FFT overlap-add. Each
+    block is then reduced to weighted energy per 100 ms hop with one reshape
+    and sum, so a track is kept as a short array of hop energies and the
+    overlapping 400 ms gating blocks are formed from them at the end. The
+    true peak comes from 4x polyphase interpolation, one matrix product per
+    block for all phases.
+    """
+
+    def __init__(self, sample_rate, channels):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.weights = np.asarray(CHANNEL_WEIGHTS.get(channels, (1.0,) * channels), dtype=np.float32)
+        self.hop_frames = int(round(sample_rate * BLOCK_SECONDS / HOPS_PER_BLOCK))
+
+        # The 38 Hz high-pass has decayed by 100 dB after about 40 ms: 2048 taps at 48 kHz
+        self.taps = 1 << math.ceil(math.log2(sample_rate / 24))
+        self.fft_size = 4 * self.taps
+        self.block_size = self.fft_size - self.taps + 1
+        design_size = 4 * self.fft_size
+        impulse = np.fft.irfft(cascade_response(k_weighting_sections(sample_rate), design_size), design_size)
+        impulse = impulse[:self.taps]
+        fade = self.taps // 8
+        impulse[-fade:] *= np.hanning(2 * fade)[fade:]
+        self._response = np.fft.rfft(impulse, self.fft_size).astype(np.complex64)[:, None]
+        self._tail = np.zeros((self.fft_size, channels), dtype=np.float32)
+
+        # Windowed sinc low-pass at the original Nyquist frequency, split into one filter per output phase
+        length = OVERSAMPLING * INTERPOLATION_TAPS
+        n = np.arange(length) - (length - 1) / 2.0
+        interpolator = np.sinc(n / OVERSAMPLING) * np.kaiser(length, 5.0)
+        phases = interpolator.reshape(INTERPOLATION_TAPS, OVERSAMPLING).T[:, ::-1]
+        self._phases = (phases / phases.sum(axis=1, keepdims=True)).T.astype(np.float32)  # (taps, phases)
+        self._history = np.zeros((INTERPOLATION_TAPS - 1, channels), dtype=np.float32)
+
+        self._energy_leftover = np.zeros(0, dtype=np.float32)
+        self._hop_energies = []
+        self.peak = 0.0  # Linear true peak
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if not len(block):
+            return
+        self._update_peak(block)
+
+        weighted = np.empty_like(block)
+        for start in range(0, len(block), self.block_size):
+            chunk = block[start:start + self.block_size]
+            frames = len(chunk)
+            spectrum = np.fft.rfft(chunk, self.fft_size, axis=0)
+            filtered = np.fft.irfft(spectrum * self._response, self.fft_size, axis=0)
+            filtered += self._tail
+            weighted[start:start + frames] = filtered[:frames]
+            self._tail[:-frames] = filtered[frames:]
+            self._tail[-frames:] = 0
+
+        energy = np.concatenate((self._energy_leftover, (weighted * weighted) @ self.weights))
+        whole = len(energy) - len(energy) % self.hop_frames
+        self._hop_energies.append(energy[:whole].reshape(-1, self.hop_frames).sum(axis=1, dtype=np.float64))
+        self._energy_leftover = energy[whole:]
+
+    def _update_peak(self, block):
+        samples = np.concatenate((self._history, block))
+        self._history = samples[-(INTERPOLATION_TAPS - 1):]
+        for channel in range(self.channels):
+            windows = np.lib.stride_tricks.sliding_window_view(samples[:, channel], INTERPOLATION_TAPS)
+            self.peak = max(self.peak, float(np.abs(windows @ self._phases).max()))
+
+    def block_energies(self):
+        """
+        Mean square of every complete 400 ms gating block so far, as float64.
+        """
+        hops = np.concatenate(self._hop_energies) if self._hop_energies else np.zeros(0)
+        if len(hops) < HOPS_PER_BLOCK:
+            return np.zeros(0)
+        totals = np.concatenate(([0.0], np.cumsum(hops)))
+        return (totals[HOPS_PER_BLOCK:] - totals[:-HOPS_PER_BLOCK]) / (HOPS_PER_BLOCK * self.hop_frames)
+
+    def loudness(self):
+        return gated_loudness(self.block_energies())
+
+
+def analyze_track(file_path):
+    """
+    Measure file_path; returns (integrated loudness in LUFS or None, linear true peak, gating block energies).
+
+    The block energies are what album loudness is computed from. Runs in the
+    loudness analyzer's worker processes.
+    """
+    sample_rate, channels, blocks = decode(file_path, ANALYSIS_SAMPLE_RATE)
+    meter = LoudnessMeter(sample_rate, channels)
+    for block in blocks:
+        meter.process(block)
+    energies = meter.block_energies()
+    return gated_loudness(energies), meter.peak, energies.astype(np.float32)
@@ -0,0 +1,183 @@
+import math
+import os
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+REFERENCE_LOUDNESS = -18.0  # LUFS that playback gain brings a track to, as in ReplayGain 2.0
+
+
+def _lower_priority():
+    # Analysis is background work, playback and the GUI come first
+    if hasattr(os, 'nice'):
+        os.nice(10)
+
+
+def playback_gain(track, album=False):
+    """
+    Playback gain in dB for an index record, 0 if it hasn't been measured.
+
+    With album, the album's loudness is used so the levels within an album
+    are kept. The gain is limited so the true peak doesn't go over full scale.
+    """
+    loudness, peak = track.get('loudness'), track.get('true_peak')
+    if album and track.get('album_loudness') is not None:
+        loudness, peak = track['album_loudness'], track['album_peak']
+    if loudness is None:
+        return 0.0
+    gain = REFERENCE_LOUDNESS - loudness
+    if peak:
+        gain = min(gain, -20.0 * math.log10(peak))
+    return gain
+
+
+def album_groups(tracks):
+    """
+    Group tracks into the units loudness is measured in: an album is the tracks sharing an album tag and folder.
+
+    Tracks without an album tag form a group of their own.
+    """
+    groups = {}
+    for track in tracks:
+        if track.get('album'):
+            key = (os.path.dirname(track['path']), track['album'])
+        else:
+            key = (track['path'], None)
+        groups.setdefault(key, []).append(track)
+    return list(groups.values())
+
+
+class LoudnessAnalyzer(QObject):
+    """
+    Measures the loudness of library tracks in the background, an album at a time.
+
+    Tracks are decoded and measured in a process pool running at low
+    priority. Album loudness is gated over the blocks of all its tracks
+    together, so an album is always measured as a whole, and its results
+    come back as one batch through loudnessReady. Tracks pcm_decoder can't
+    read here (anything but WAV without ffmpeg) are left out without trying.
+    Tracks that fail to decode come back flagged with loudness_failed; once
+    that is stored they aren't tried again until the file changes. A broken
+    pool (a worker died) says nothing about the tracks, so nothing is flagged
+    then: the pool is dropped and the next analyze() starts a new one.
+    """
+    loudnessReady = pyqtSignal(list)  # dicts with path, mtime, size and the loudness columns or loudness_failed
+
+    def __init__(self, parent=None, max_workers=None):
+        super(LoudnessAnalyzer, self).__init__(parent)
+        # Half the cores, the library scanner and playback need the rest
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) // 2)
+        self._executor = None
+        self._executor_lock = threading.Lock()  # A cancelled analysis can still be submitting as the next one starts
+        self._cancelled = threading.Event()
+
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=_lower_priority
+                )
+            return self._executor
+
+    def analyze(self, tracks):
+        """
+        Measure every album among tracks that has a track without a measurement, cancelling a running analysis.
+
+        tracks are index records; only path, mtime, size, album and the
+        loudness columns are used.
+        """
+        self.cancel()
+        albums = [
+            album for album in album_groups(tracks)
+            # Silent tracks have no loudness, but every measured track has a peak
+            if any(track.get('true_peak') is None and not track.get('loudness_failed') for track in album)
+        ]
+        if not albums:
+            return
+        self._cancelled = threading.Event()
+        thread = threading.Thread(target=self._run, args=(albums, self._cancelled), daemon=True)
+        thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def shutdown(self):
+        self.cancel()
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _discard_executor(self, executor):
+        # Leaves a pool created by another run in the meantime alone
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, albums, cancelled):
+        # Imported here, NumPy is only needed once there is something to measure
+        from concurrent.futures import CancelledError
+        from concurrent.futures.process import BrokenProcessPool
+        from loudness import analyze_track, gated_loudness
+        from pcm_decoder import can_decode
+        import numpy as np
+
+        executor = None
+        try:
+            albums = [[track for track in album if can_decode(track['path'])] for album in albums]
+            albums = [
+                album for album in albums
+                if any(track.get('true_peak') is None and not track.get('loudness_failed') for track in album)
+            ]
+            if not albums:
+                return
+            # Everything is queued up front, the pool works through it album by album
+            executor = self.executor()
+            submitted = [[(track, executor.submit(analyze_track, track['path'])) for track in album]
+                         for album in albums]
+            for album in submitted:
+                results = []
+                failures = []
+                energies = []
+                for track, future in album:
+                    if cancelled.is_set():
+                        for pending in submitted:
+                            for _, pending_future in pending:
+                                pending_future.cancel()
+                        return
+                    try:
+                        loudness, peak, block_energies = future.result()
+                    except (BrokenProcessPool, CancelledError):
+                        raise  # Not the track's fault, see below
+                    except Exception as e:
+                        print(f"Error measuring loudness: {e}")
+                        failures.append({
+                            'path': track['path'], 'mtime': track['mtime'], 'size': track['size'],
+                            'loudness_failed': 1,
+                        })
+                        continue
+                    results.append({
+                        'path': track['path'], 'mtime': track['mtime'], 'size': track['size'],
+                        'loudness': loudness, 'true_peak': peak,
+                    })
+                    energies.append(block_energies)
+                if results:
+                    album_loudness = gated_loudness(np.concatenate(energies))
+                    album_peak = max(result['true_peak'] for result in results)
+                    for result in results:
+                        result['album_loudness'] = album_loudness
+                        result['album_peak'] = album_peak
+                if (results or failures) and not cancelled.is_set():
+                    self.loudnessReady.emit(results + failures)
+        except CancelledError:
+            pass  # Shut down
+        except BrokenProcessPool as e:
+            # Every track still queued fails with it; they're left unflagged for the next analysis
+            print(f"Error measuring loudness: {e}")
+            if executor is not None:
+                self._discard_executor(executor)
+        except Exception as e:
+            print(f"Error measuring loudness: {e}")
@@ -1,16 +1,75 @@
 import os
 import sys
-# noinspection PyUnresolvedReferences
-import resources_rc
-from PyQt5.QtCore import QUrl, QDir, pyqtSignal, Qt, QTime
+
+import startup_profiler
+
+if __name__ == "__main__":
+    # Must run before the imports below so they show up in the trace
+    startup_profiler.start(sys.argv)
+
+from PyQt5.QtCore import QDir, pyqtSignal, Qt, QTimer, QResource
 from PyQt5.QtGui import QIcon, QPixmap, QImage
-from PyQt5.QtMultimedia import QMediaContent, QMediaPlayer
-from PyQt5.QtWidgets import QLabel, QMainWindow, QGridLayout, QApplication, QFileDialog, QFrame, QVBoxLayout, QSlider, \
-    QDialog
-from PyQt5.uic import loadUi
-from mutagen import File
-from mutagen.flac import FLAC
-from mutagen.id3 import ID3
+from PyQt5.QtWidgets import QLabel, QMainWindow, QApplication, QFileDialog, QVBoxLayout, QHBoxLayout, QSlider, QDialog, QMenu, \
+    QPushButton
+
+from cover_cache import CoverLoader, ThumbnailCache, cover_pixmaps, decode_scaled
+from library_index import TrackIndex
+from library_scanner import LibraryScanner
+from library_view import COVER_SIZE, GRID_SIZE, TrackDelegate, TrackListModel
+from library_watcher import LibraryWatcher
+from loudness_analyzer import LoudnessAnalyzer, playback_gain
+from metadata import read_track_info
+from paths import user_data_dir
+from play_queue import PlayQueue
+from playback import PlaybackEngine, PlaybackState
+from search_index import SearchIndex
+from session import SessionSnapshot
+from ui_cache import load_ui
+from ui_throttle import UpdateThrottle
+from waveform_view import WaveformLoader, WaveformSlider
+
+startup_profiler.checkpoint("imports")
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Built from utils/music.qrc by build_resources.py; Qt memory-maps it when registered
+RESOURCE_FILE = os.path.join(BASE_DIR, "utils", "music.rcc")
+UI_FILE = os.path.join(BASE_DIR, "new.ui")
+RESTORE_CHUNK_SIZE = 2000  # Restored tracks added to the search index per event loop turn
+TRANSPORT_FPS = 10  # Most redraws of the seek slider and time label per second
+
+# Parsed once for the whole application instead of per widget; rules are scoped by class name
+APP_STYLESHEET = """
+    VolumeSliderDialog QSlider::groove:vertical {
+        background: #ddd;
+        width: 8px;
+        border-radius: 4px;
+    }
+    VolumeSliderDialog QSlider::handle:vertical {
+        background: #0d6efd;
+        border: 1px solid #0a58ca;
+        height: 20px;
+        width: 20px;
+        margin: -5px;
+        border-radius: 10px;
+    }
+    VolumeSliderDialog QSlider::add-page:vertical {
+        background: #ddd;
+    }
+    VolumeSliderDialog QSlider::sub-page:vertical {
+        background: #0d6efd;
+    }
+"""
+
+_resources_registered = False
+
+
+def register_resources():
+    global _resources_registered
+    if not _resources_registered:
+        _resources_registered = QResource.registerResource(RESOURCE_FILE)
+        if not _resources_registered:
+            print(f"Error registering resources: {RESOURCE_FILE}")
 
 
 def change_volume(value):
@@ -29,28 +88,7 @@ class VolumeSliderDialog(QDialog):
         # Create a vertical slider for volume control
         self.slider = QSlider(Qt.Vertical)
         self.slider.setRange(0, 100)
-        self.slider.setValue(50)  # Set default volume to 50
-        self.slider.setStyleSheet("""
-            QSlider::groove:vertical {
-                background: #ddd;
-                width: 8px;
-                border-radius: 4px;
-            }
-            QSlider::handle:vertical {
-                background: #0d6efd;
-                border: 1px solid #0a58ca;
-                height: 20px;
-                width: 20px;
-                margin: -5px;
-                border-radius: 10px;
-            }
-            QSlider::add-page:vertical {
-                background: #ddd;
-            }
-            QSlider::sub-page:vertical {
-                background: #0d6efd;
-            }
-        """)
+        self.slider.setValue(50)  # Set default volume to 50 (styled by APP_STYLESHEET)
 
         layout.addWidget(self.slider)
         self.setLayout(layout)
@@ -63,6 +101,54 @@ class VolumeSliderDialog(QDialog):
         self.show()
 
 
+class EqualizerDialog(QDialog):
+    """
+    Popup with one slider per equalizer band, in dB.
+    """
+    gainsChanged = pyqtSignal(list)
+
+    def __init__(self, frequencies, max_gain_db, gains, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.Popup | Qt.FramelessWindowHint)
+
+        layout = QHBoxLayout(self)
+        self.sliders = []
+        for frequency, gain in zip(frequencies, gains):
+            band_layout = QVBoxLayout()
+            slider = QSlider(Qt.Vertical)
+            slider.setRange(-int(max_gain_db), int(max_gain_db))
+            slider.setValue(round(gain))
+            slider.setFixedHeight(120)
+            slider.valueChanged.connect(self.emit_gains)
+            label = QLabel(f"{frequency // 1000}k" if frequency >= 1000 else str(frequency))
+            label.setAlignment(Qt.AlignHCenter)
+            band_layout.addWidget(slider, 0, Qt.AlignHCenter)
+            band_layout.addWidget(label)
+            layout.addLayout(band_layout)
+            self.sliders.append(slider)
+
+        flat_button = QPushButton("Flat")
+        flat_button.clicked.connect(self.reset)
+        layout.addWidget(flat_button, 0, Qt.AlignBottom)
+
+    def gains(self):
+        return [slider.value() for slider in self.sliders]
+
+    def emit_gains(self):
+        self.gainsChanged.emit(self.gains())
+
+    def reset(self):
+        for slider in self.sliders:
+            slider.blockSignals(True)
+            slider.setValue(0)
+            slider.blockSignals(False)
+        self.emit_gains()
+
+    def show_at_position(self, pos):
+        self.move(pos)
+        self.show()
+
+
 class ClickableLabel(QLabel):
     clicked = pyqtSignal()
 
@@ -77,88 +163,17 @@ def on_click():
     print("StyledLabel clicked")
 
 
-class StyledLabel(QFrame):
-    clicked = pyqtSignal(str)  # Signal that emits the file path when clicked
+def format_time(milliseconds):
+    # mm:ss, the minutes wrap at an hour like QTime's
+    minutes, seconds = divmod(milliseconds // 1000 % 3600, 60)
+    return f"{minutes:02d}:{seconds:02d}"
 
-    def __init__(self, parent=None):
-        super(StyledLabel, self).__init__(parent)
-        self.setFixedSize(200, 200)
-        self.setObjectName("styled-label")
-        self.vlay = QVBoxLayout(self)
-        self.vlay.setContentsMargins(0, 0, 0, 0)
-        self.vlay.setSpacing(0)
-
-        self.cover = QLabel(self)
-        self.cover.setFixedSize(200, 150)
-        self.cover.setStyleSheet("border-radius: 10px;")
-
-        self.title = QLabel(self)
-        self.title.setObjectName("track-item-title")
-        self.artist = QLabel(self)
-        self.artist.setObjectName("track-item-artist")
-
-        self.vlay.addWidget(self.cover, alignment=Qt.AlignCenter)
-        self.vlay.addWidget(self.title, alignment=Qt.AlignCenter)
-        self.vlay.addWidget(self.artist, alignment=Qt.AlignCenter)
-
-        self.setStyleSheet("""
-            #styled-label {
-                background-color: rgb(45, 49, 48);
-                border-radius: 10px;
-                padding: 10px;
-            }
-            #track-item-title {
-                color: white;
-                font-weight: bold;
-                font-size: 14px;
-            }
-            #track-item-artist {
-                color: lightgray;
-                font-size: 12px;
-            }
-        """)
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            file_path = self.property('file_path')
-            self.clicked.emit(file_path)  # Emit signal with file path
 
-    def set_cover(self, imgpath):
-        try:
-            pixmap = QPixmap(imgpath)
-            pixmap = pixmap.scaled(self.cover.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.cover.setPixmap(pixmap)
-        except Exception as e:
-            print(f"Error setting cover: {e}")
-            self.cover.setPixmap(QPixmap(":/icons/images/icons8-album-48.png"))
-
-    def set_title(self, title):
-        self.title.setText(title)
-
-    def set_artist(self, artist):
-        self.artist.setText(artist)
-
-
-def extract_album_art(file_path):
-    image_data = None
-    try:
-        if file_path.lower().endswith('.mp3'):
-            audio_file = ID3(file_path)
-            for tag in audio_file.getall('APIC'):
-                image_data = tag.data
-                break
-        elif file_path.lower().endswith('.flac'):
-            audio_file = FLAC(file_path)
-            for tag in audio_file.pictures:
-                image_data = tag.data
-                break
-
-        if image_data:
-            image = QImage.fromData(image_data)
-            if not image.isNull():
-                return QPixmap(image)
-    except Exception as e:
-        print(f"Error extracting album art: {e}")
+def pixmap_from_data(image_data):
+    if image_data:
+        image = QImage.fromData(image_data)
+        if not image.isNull():
+            return QPixmap(image)
 
     # Return a default image if no album art is found
     return QPixmap(":/icons/images/icons8-album-48.png")
@@ -167,11 +182,17 @@ def extract_album_art(file_path):
 class MainWindow(QMainWindow):
     def __init__(self):
         super(MainWindow, self).__init__()
-        self.isPlaying = None
         self.current_file_path = None
         self.current_folder_path = None  # Initialize this to avoid crashes
+        with startup_profiler.phase("register resources"):
+            register_resources()
+        with startup_profiler.phase("open track index"):
+            self.trackIndex = TrackIndex()
+        self.coverLoader = CoverLoader(ThumbnailCache(COVER_SIZE), self.trackIndex.db_path, self)
+        self.coverLoader.coverReady.connect(self.cover_loaded)
 
-        loadUi("new.ui", self)
+        with startup_profiler.phase("load ui"):
+            load_ui(UI_FILE, self)
 
         self.homePushButton.clicked.connect(self.switch_to_home_page)
         self.playlistsPushButton.clicked.connect(self.switch_to_playlists_page)
@@ -179,28 +200,111 @@ class MainWindow(QMainWindow):
         self.recentsPushButton.clicked.connect(self.switch_to_recents_page)
         self.settingsPushButton.clicked.connect(self.switch_to_settings_page)
 
-        self.gridLayout = QGridLayout(self.scrollAreaWidgetContents_5)
-        self.scrollAreaWidgetContents_5.setLayout(self.gridLayout)
+        # The home page is a model/view grid: only the visible tiles are painted
+        self.trackModel = TrackListModel(self)
+        self.libraryView.setModel(self.trackModel)
+        self.libraryView.setGridSize(GRID_SIZE)
+        self.libraryView.setItemDelegate(TrackDelegate(self.tile_cover, self.libraryView))
+        self.libraryView.clicked.connect(self.track_clicked)
+        self.libraryView.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.libraryView.customContextMenuRequested.connect(self.show_track_menu)
+
+        # As-you-type search: keystrokes are debounced, only the latest query ever runs
+        self.searchIndex = SearchIndex()
+        self.searchTimer = QTimer(self)
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.setInterval(150)
+        self.searchTimer.timeout.connect(self.apply_search)
+        self.searchlineEdit.textChanged.connect(self.searchTimer.start)
+
+        self.libraryScanner = LibraryScanner(self)
+        self.libraryScanner.tracksReady.connect(self.add_scanned_tracks)
+        self.libraryScanner.scanProgress.connect(self.show_scan_progress)
+        self.libraryScanner.scanFinished.connect(self.scan_finished)
+        self.libraryScanner.libraryChanged.connect(self.apply_library_changes)
+        self.parseStats = {'files': 0, 'syscalls': 0, 'bytes_read': 0}  # I/O of the files parsed by the current scan
+
+        # Changes on disk are applied as small diffs instead of rescanning the whole folder
+        self.libraryWatcher = LibraryWatcher(self)
+        self.libraryWatcher.directoriesChanged.connect(self.rescan_directories)
+        self.libraryWatcher.recheckDue.connect(self.recheck_library)
+
+        # Tracks are measured once indexed, their playback gain is applied when they start
+        self.loudnessAnalyzer = LoudnessAnalyzer(self)
+        self.loudnessAnalyzer.loudnessReady.connect(self.store_loudness)
 
         self.loadFolderButton.clicked.connect(self.load_folder)
-        self.mediaPlayer = QMediaPlayer(None, QMediaPlayer.StreamPlayback)
+        self._playbackEngine = None  # Created on first use, see playbackEngine
         self.pushButtonPlayPause.clicked.connect(self.toggle_play_pause)
 
+        self.playQueue = PlayQueue()
+        self.sessionFile = os.path.join(user_data_dir(), "session.bin")
+        self.resumePosition = 0  # Where the restored track was when the app was closed, in ms
+        self.nextButton.clicked.connect(self.play_next)
+        self.previousButton.clicked.connect(self.play_previous)
+        self.shuffleButton.toggled.connect(self.set_shuffled)
+
         self.labelSongName = self.findChild(QLabel, 'labelSongName')
         self.labelArtist = self.findChild(QLabel, 'labelArtist')
 
-        # Connect the media player to the slider and labels
-        self.mediaPlayer.positionChanged.connect(self.update_position)
-        self.mediaPlayer.durationChanged.connect(self.update_duration)
+        # The seek slider from the .ui file is swapped for one that draws the track's waveform
+        waveform_slider = WaveformSlider(self.musicSlider.parentWidget())
+        waveform_slider.setObjectName("musicSlider")
+        waveform_slider.setCursor(Qt.PointingHandCursor)
+        self.musicSlider.parentWidget().layout().replaceWidget(self.musicSlider, waveform_slider)
+        self.musicSlider.hide()
+        self.musicSlider.deleteLater()
+        self.musicSlider = waveform_slider
+        self.waveformLoader = WaveformLoader(self)
+        self.waveformLoader.waveformReady.connect(self.waveform_loaded)
 
         # Connect slider to allow seeking in the song
         self.musicSlider.sliderMoved.connect(self.set_position)
 
+        # Position changes are coalesced, the transport is redrawn at most TRANSPORT_FPS times a second
+        self.positionThrottle = UpdateThrottle(self.show_position, TRANSPORT_FPS, self)
+        self.shownSecond = None  # Second the current time label shows
+
         self.volumeButton.clicked.connect(self.show_volume_slider)
 
         # Create the volume slider popup dialog (hidden by default)
         self.volumeSliderDialog = VolumeSliderDialog(self)
 
+        self.equalizerGains = None  # dB per band, None while flat
+        self.equalizerDialog = None  # Created on first use, it loads the DSP code and NumPy
+        self.equalizerButton.clicked.connect(self.show_equalizer)
+
+        with startup_profiler.phase("restore session"):
+            self.restore_session()
+
+    @property
+    def playbackEngine(self):
+        # QtMultimedia is only loaded once something is played, not to show the window
+        if self._playbackEngine is None:
+            self._playbackEngine = PlaybackEngine(self, self.track_gain, self.track_duration)
+            self._playbackEngine.trackChanged.connect(self.track_changed)
+            self._playbackEngine.stateChanged.connect(self.playback_state_changed)
+
+            # Connect the media player to the slider and labels
+            self._playbackEngine.positionChanged.connect(self.update_position)
+            self._playbackEngine.durationChanged.connect(self.update_duration)
+            self._playbackEngine.set_equalizer(self.equalizerGains)
+        return self._playbackEngine
+
+    def preload_next(self):
+        # Nothing to preload while nothing has played yet
+        if self._playbackEngine is not None:
+            self._playbackEngine.set_next(self.playQueue.peek())
+
+    def track_gain(self, file_path):
+        # Album gain keeps an album's quiet tracks quiet, but shuffled tracks are levelled one by one
+        track = self.trackIndex.track(file_path)
+        return playback_gain(track, album=not self.playQueue.shuffled) if track else 0.0
+
+    def track_duration(self, file_path):
+        track = self.trackIndex.track(file_path)
+        return int((track['duration'] or 0) * 1000) if track else None
+
     def show_volume_slider(self):
         # Get the button's position and calculate the position for the slider
         button_pos = self.volumeButton.mapToGlobal(self.volumeButton.rect().bottomRight())
@@ -212,9 +316,25 @@ class MainWindow(QMainWindow):
         # Connect the volume slider's valueChanged signal to the media player volume
         self.volumeSliderDialog.slider.valueChanged.connect(self.adjust_volume)
 
+    def show_equalizer(self):
+        if self.equalizerDialog is None:
+            from equalizer import BAND_FREQUENCIES, MAX_GAIN_DB
+            gains = self.equalizerGains or [0] * len(BAND_FREQUENCIES)
+            self.equalizerDialog = EqualizerDialog(BAND_FREQUENCIES, MAX_GAIN_DB, gains, self)
+            self.equalizerDialog.gainsChanged.connect(self.set_equalizer_gains)
+            self.equalizerDialog.adjustSize()
+
+        button_pos = self.equalizerButton.mapToGlobal(self.equalizerButton.rect().topRight())
+        self.equalizerDialog.show_at_position(button_pos - self.equalizerDialog.rect().bottomRight())
+
+    def set_equalizer_gains(self, gains):
+        self.equalizerGains = gains if any(gains) else None
+        if self._playbackEngine is not None:
+            self._playbackEngine.set_equalizer(self.equalizerGains)
+
     def adjust_volume(self, value):
         """ Adjust the media player volume based on the slider value """
-        self.mediaPlayer.setVolume(value)  # Set the media player volume
+        self.playbackEngine.set_volume(value)  # Set the media player volume
 
     def switch_to_home_page(self):
         self.stackedWidget.setCurrentIndex(0)
@@ -235,134 +355,380 @@ class MainWindow(QMainWindow):
         folder_path = QFileDialog.getExistingDirectory(self, "Select Folder", QDir.homePath())
         if folder_path:
             self.current_folder_path = folder_path  # Save folder path
-            self.load_songs_into_scroll_area(folder_path)
-
-    def load_songs_into_scroll_area(self, folder_path):
-        layout = self.gridLayout
-        scroll_area_width = self.scrollAreaWidgetContents_5.width()  # Use the contents widget width
-        widget_width = 200  # Width of each song widget (adjust as necessary)
-        max_columns = max(1, scroll_area_width // widget_width)  # Calculate max columns
-
-        # Ensure the scroll area only scrolls vertically
-        self.scrollArea.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.scrollArea.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-
-        # Clear existing widgets from the grid layout
-        for i in reversed(range(layout.count())):
-            widget_to_remove = layout.itemAt(i).widget()
-            layout.removeWidget(widget_to_remove)
-            widget_to_remove.deleteLater()
-
-        supported_formats = ['.mp3', '.flac', '.wav', '.m4a']
-        row, col = 0, 0
-
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            if os.path.isfile(file_path) and any(file_name.lower().endswith(ext) for ext in supported_formats):
-                self.add_song_label(file_path, row, col)
-                col += 1
-                if col >= max_columns:
-                    col = 0
-                    row += 1
-
-    def resizeEvent(self, event):
-        # Only reload songs if a folder has been loaded
+            self.load_songs_into_library(folder_path)
+
+    def load_songs_into_library(self, folder_path):
+        # Tag parsing happens off the GUI thread, tiles are added as batches arrive
+        self.trackModel.set_tracks([])
+        self.searchIndex.clear()
+        self.libraryWatcher.clear()
+        self.loudnessAnalyzer.cancel()
+        self.parseStats = dict.fromkeys(self.parseStats, 0)
+        self.libraryScanner.scan(folder_path, self.trackIndex.tracks_in(folder_path))
+
+    def add_scanned_tracks(self, scan_id, tracks):
+        if scan_id != self.libraryScanner.scan_id:
+            return  # Batch from a scan that has since been cancelled
+
+        for track in tracks:
+            if 'art' in track:  # Freshly parsed, not served from the index
+                self.store_parsed_track(track)
+        self.searchIndex.add_tracks(tracks)
+        self.trackIndex.commit()
+        self.trackModel.append_tracks(tracks)
+        if self.searchlineEdit.text():
+            self.searchTimer.start()  # Let the active search pick up the new tracks
+
+    def store_parsed_track(self, track):
+        self.trackIndex.store(track)
+        track.pop('art')  # The cover lives in the index, don't keep the bytes around per track
+        self.parseStats['files'] += 1
+        self.parseStats['syscalls'] += track.pop('syscalls')
+        self.parseStats['bytes_read'] += track.pop('bytes_read')
+
+    def apply_search(self):
+        query = self.searchlineEdit.text()
+        results = self.searchIndex.search(query)
+        if results is not None and not results:
+            # Nothing starts with what was typed, fall back to typo-tolerant ranked results
+            results = self.searchIndex.fuzzy_search(query)
+        self.trackModel.set_filter(results)
+
+    def show_scan_progress(self, scan_id, found, files_per_second):
+        if scan_id == self.libraryScanner.scan_id:
+            self.statusBar().showMessage(f"Scanning: {found} files ({files_per_second:.0f} files/s)")
+
+    def scan_finished(self, scan_id, complete):
+        if scan_id == self.libraryScanner.scan_id:
+            message = f"{len(self.trackModel.all_tracks)} tracks"
+            if not complete:
+                message += " (the scan stopped on an error, rescan to find the rest)"
+            files = self.parseStats['files']
+            if files:
+                message += (
+                    f", {files} parsed: {self.parseStats['syscalls'] / files:.0f} syscalls and "
+                    f"{self.parseStats['bytes_read'] / files / 1024:.0f} KB read per file"
+                )
+            self.statusBar().showMessage(message, 3000)
+            if complete:
+                self.remove_stale_tracks()  # Rows an aborted scan didn't get to aren't stale
+            self.libraryWatcher.watch(self.current_folder_path, [track['path'] for track in self.trackModel.all_tracks])
+            self.analyze_loudness()
+
+    def remove_stale_tracks(self):
+        # Rows of files a full scan no longer finds: deleted while the app was closed,
+        # or reached through a symlink loop by an earlier version
+        if not self.current_folder_path:
+            return
+        found = {track['path'] for track in self.trackModel.all_tracks}
+        stale = [path for path in self.trackIndex.tracks_in(self.current_folder_path) if path not in found]
+        if stale:
+            self.trackIndex.remove(stale)
+            self.trackIndex.commit()
+
+    def rescan_directories(self, directories):
+        known_tracks = {}
+        for directory in directories:
+            known_tracks.update(self.trackIndex.tracks_in(directory))
+        self.libraryScanner.rescan(directories, known_tracks, self.libraryWatcher.directories())
+
+    def recheck_library(self):
+        # Every watched directory is listed again and each file's mtime and size compared with its row
+        directories = self.libraryWatcher.directories()
+        self.libraryScanner.rescan(
+            directories, {track['path']: track for track in self.trackModel.all_tracks}, directories
+        )
+
+    def apply_library_changes(self, scan_id, updated, removed):
+        if scan_id != self.libraryScanner.scan_id:
+            return
+
+        for track in updated:
+            self.store_parsed_track(track)
+        self.searchIndex.add_tracks(updated)
+        self.trackIndex.remove(removed)
+        self.trackIndex.commit()
+        for path in removed:
+            self.searchIndex.remove(path)
+        self.trackModel.apply_changes(updated, removed)
+        if self.searchlineEdit.text():
+            self.searchTimer.start()
+        if removed:
+            self.playQueue.remove_paths(removed)
+            self.preload_next()
+        self.libraryWatcher.add_tracks([track['path'] for track in updated])
+        if updated:
+            self.analyze_loudness()
+
+    def analyze_loudness(self):
+        # Measured values only live in the index, the in-memory track records don't get them
         if self.current_folder_path:
-            self.load_songs_into_scroll_area(self.current_folder_path)  # Reload with new size
-        super().resizeEvent(event)
-
-    def add_song_label(self, file_path, row, col):
-        try:
-            audio_file = File(file_path)
-            if audio_file and audio_file.tags:
-                song_title = audio_file.tags.get('TIT2', ['Unknown Title'])[0]
-                artist_name = audio_file.tags.get('TPE1', ['Unknown Artist'])[0]
-            else:
-                song_title = os.path.basename(file_path)
-                artist_name = "Unknown Artist"
+            self.loudnessAnalyzer.analyze(list(self.trackIndex.tracks_in(self.current_folder_path).values()))
 
-            album_art = extract_album_art(file_path)
+    def store_loudness(self, results):
+        self.trackIndex.store_loudness(results)
+        self.trackIndex.commit()
 
-            song_label = StyledLabel(self)
-            song_label.set_cover(album_art if album_art else ":/icons/images/icons8-album-48.png")
-            song_label.set_title(song_title)
-            song_label.set_artist(artist_name)
+    def tile_cover(self, art_hash):
+        """
+        Return the tile-sized cover for art_hash, or None while it's being loaded.
 
-            # Set the file path as a property
-            song_label.setProperty('file_path', file_path)
+        Covers that aren't in the shared pixmap cache are requested from the
+        cover loader; since only visible tiles are painted, only visible covers
+        are ever decoded.
+        """
+        key = (art_hash, COVER_SIZE.width(), COVER_SIZE.height())
+        pixmap = cover_pixmaps.get(key)
+        if pixmap is None:
+            if art_hash:
+                self.coverLoader.request(art_hash)
+                return None
+            pixmap = pixmap_from_data(None).scaled(COVER_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            cover_pixmaps.put(key, pixmap)
+        return pixmap
+
+    def cover_loaded(self, art_hash, image):
+        key = (art_hash, COVER_SIZE.width(), COVER_SIZE.height())
+        if image.isNull():
+            pixmap = pixmap_from_data(None).scaled(COVER_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        else:
+            pixmap = QPixmap.fromImage(image)
+        cover_pixmaps.put(key, pixmap)
+        self.libraryView.viewport().update()
+
+    def track_clicked(self, index):
+        # Playing from the library queues the whole grid, starting at the clicked track
+        self.playQueue.set_tracks([track['path'] for track in self.trackModel.tracks], index.row())
+        self.play_song(index.data(TrackListModel.PathRole))
+
+    def show_track_menu(self, pos):
+        index = self.libraryView.indexAt(pos)
+        if not index.isValid():
+            return
+        file_path = index.data(TrackListModel.PathRole)
+        menu = QMenu(self)
+        play_next_action = menu.addAction("Play next")
+        add_to_queue_action = menu.addAction("Add to queue")
+        action = menu.exec_(self.libraryView.viewport().mapToGlobal(pos))
+        if action is play_next_action:
+            self.playQueue.insert_next(file_path)
+        elif action is add_to_queue_action:
+            self.playQueue.append(file_path)
+        else:
+            return
+        self.preload_next()
 
-            # Connect the label's clicked signal to song_label_clicked method
-            song_label.clicked.connect(self.song_label_clicked)
+    def restore_session(self):
+        """
+        Show the library, queue and current track as they were on exit, before anything is rescanned.
+        """
+        snapshot = SessionSnapshot.load(self.sessionFile)
+        if snapshot is None:
+            return
+
+        self.equalizerGains = snapshot.equalizer_gains
+        if snapshot.queue is not None and self.playQueue.restore(snapshot.queue):
+            self.shuffleButton.setChecked(self.playQueue.shuffled)
+
+        if snapshot.folder_path:
+            self.current_folder_path = snapshot.folder_path
+            self.trackModel.set_tracks(snapshot.tracks)
+            # The grid is laid out once the window is shown, scroll afterwards
+            scroll_position = snapshot.scroll_position
+            QTimer.singleShot(0, lambda: self.libraryView.verticalScrollBar().setValue(scroll_position))
+            QTimer.singleShot(0, self.revalidate_library)
+
+        if snapshot.current_path:
+            self.current_file_path = snapshot.current_path
+            self.resumePosition = snapshot.position
+            track = self.trackIndex.track(snapshot.current_path)
+            if track is not None:
+                self.show_track_info(track['title'], track['artist'], self.player_cover(track))
+                self.update_duration(int((track['duration'] or 0) * 1000))
+                self.update_position(snapshot.position)
+                self.show_waveform(snapshot.current_path)
+
+    def revalidate_library(self, tracks=None, start=0):
+        """
+        Bring a library restored from the session snapshot up to date with the disk.
 
-            self.gridLayout.addWidget(song_label, row, col)
-        except Exception as e:
-            print(f"Error adding song label: {e}")
+        The restored tracks are added to the search index a slice at a time
+        between events. Then the snapshot rows serve as the known tracks of a
+        rescan, so only what changed since they were saved gets parsed and
+        comes back through apply_library_changes.
+        """
+        if tracks is None:
+            tracks = self.trackModel.all_tracks
+        if tracks is not self.trackModel.all_tracks:
+            return  # Another folder was loaded in the meantime
+
+        end = start + RESTORE_CHUNK_SIZE
+        self.searchIndex.add_tracks(tracks[start:end])
+        if end < len(tracks):
+            QTimer.singleShot(0, lambda: self.revalidate_library(tracks, end))
+            return
+
+        if self.searchlineEdit.text():
+            self.searchTimer.start()
+        self.libraryWatcher.watch(self.current_folder_path, [track['path'] for track in tracks])
+        directories = self.libraryWatcher.directories()
+        self.libraryScanner.rescan(directories, {track['path']: track for track in tracks}, directories)
+        self.analyze_loudness()  # Picks up tracks left unmeasured last time
+
+    def save_session(self):
+        position = self.resumePosition
+        if self._playbackEngine is not None and self._playbackEngine.current_path:
+            position = self._playbackEngine.position()
+        SessionSnapshot(
+            folder_path=self.current_folder_path,
+            tracks=self.trackModel.all_tracks,
+            scroll_position=self.libraryView.verticalScrollBar().value(),
+            queue=self.playQueue.state(),
+            current_path=self.current_file_path,
+            position=position,
+            equalizer_gains=self.equalizerGains,
+        ).save(self.sessionFile)
+
+    def closeEvent(self, event):
+        self.libraryScanner.shutdown()
+        self.loudnessAnalyzer.shutdown()
+        self.trackIndex.close()
+        try:
+            self.save_session()
+        except OSError as e:
+            print(f"Error saving session: {e}")
+        super().closeEvent(event)
 
-    def song_label_clicked(self, file_path):
+    def play_song(self, file_path, position=0):
         self.current_file_path = file_path
-        self.play_song(file_path)
-
-    def play_song(self, file_path):
-        song_url = QUrl.fromLocalFile(file_path)
-        content = QMediaContent(song_url)
-        self.mediaPlayer.setMedia(content)
+        self.resumePosition = 0
+        self.playbackEngine.play(file_path)
+        if position:
+            self.playbackEngine.set_position(position)
         self.extract_metadata(file_path)
-        self.mediaPlayer.play()
-        self.pushButtonPlayPause.setIcon(QIcon("utils/images/pause.svg"))
-        self.isPlaying = True
+        self.show_waveform(file_path)
+        self.preload_next()
+
+    def play_next(self):
+        file_path = self.playQueue.next()
+        if file_path:
+            self.play_song(file_path)
+
+    def play_previous(self):
+        file_path = self.playQueue.previous()
+        if file_path:
+            self.play_song(file_path)
+
+    def set_shuffled(self, shuffled):
+        self.playQueue.set_shuffled(shuffled)
+        self.preload_next()
+
+    def track_changed(self, file_path):
+        # The engine moved on to the preloaded track by itself
+        self.playQueue.next()
+        self.current_file_path = file_path
+        self.extract_metadata(file_path)
+        self.show_waveform(file_path)
+        self.preload_next()
 
     def toggle_play_pause(self):
-        if self.isPlaying:
-            self.mediaPlayer.pause()
-            self.pushButtonPlayPause.setIcon(QIcon("utils/images/play.svg"))
-            self.isPlaying = False
+        state = self.playbackEngine.state
+        if state in (PlaybackState.PLAYING, PlaybackState.BUFFERING, PlaybackState.LOADING):
+            self.playbackEngine.pause()
+        elif state == PlaybackState.PAUSED or self.playbackEngine.current_path:
+            self.playbackEngine.resume()  # Picks up where it was, the media stays loaded
+        elif self.current_file_path:
+            self.play_song(self.current_file_path, self.resumePosition)
+
+    def playback_state_changed(self, state):
+        if state in (PlaybackState.PLAYING, PlaybackState.BUFFERING, PlaybackState.LOADING):
+            self.pushButtonPlayPause.setIcon(QIcon(":/icons/images/pause.svg"))
         else:
-            if self.current_file_path:
-                self.play_song(self.current_file_path)
+            self.pushButtonPlayPause.setIcon(QIcon(":/icons/images/play.svg"))
 
     def extract_metadata(self, file_path):
-        audio_file = File(file_path)
-        if audio_file and audio_file.tags:
-            song_title = audio_file.tags.get('TIT2', ['Unknown Title'])[0]
-            artist_name = audio_file.tags.get('TPE1', ['Unknown Artist'])[0]
-        else:
-            song_title = os.path.basename(file_path)
-            artist_name = "Unknown Artist"
+        track = self.trackIndex.track(file_path)
+        if track is not None:
+            self.show_track_info(track['title'], track['artist'], self.player_cover(track))
+            return
 
-        self.labelSongName.setText(song_title)
-        self.labelArtist.setText(artist_name)
+        # Not indexed (yet), one pass over the file gives both the tags and the cover
+        try:
+            info = read_track_info(file_path)
+        except Exception as e:
+            print(f"Error reading track info: {e}")
+            self.show_track_info(os.path.basename(file_path), "Unknown Artist", pixmap_from_data(None))
+            return
+        self.show_track_info(info.title, info.artist, pixmap_from_data(info.art))
+
+    def show_track_info(self, title, artist, cover):
+        self.labelSongName.setText(title)
+        self.labelArtist.setText(artist)
+
+        # Set the album art as the button icon
+        self.albumButton.setIcon(QIcon(cover))
+        self.albumButton.setIconSize(self.albumButton.size())  # Set icon size to match the button size
+
+    def player_cover(self, track):
+        # Decoded covers are shared with the library grid
+        size = self.albumButton.size()
+        key = (track['art_hash'], size.width(), size.height())
+        pixmap = cover_pixmaps.get(key)
+        if pixmap is None:
+            cover_data = self.trackIndex.cover_data(track['art_hash']) if track['art_hash'] else None
+            image = decode_scaled(cover_data, size) if cover_data else QImage()
+            if image.isNull():
+                pixmap = pixmap_from_data(None).scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            else:
+                pixmap = QPixmap.fromImage(image)
+            cover_pixmaps.put(key, pixmap)
+        return pixmap
 
-        # Extract album art and set it as the button icon
-        album_art = extract_album_art(file_path)
-        if album_art:
-            self.albumButton.setIcon(QIcon(album_art))
-            self.albumButton.setIconSize(self.albumButton.size())  # Set icon size to match the button size
+    def show_waveform(self, file_path):
+        # Computed in the background the first time, read from the cache after that
+        self.musicSlider.set_peaks(None)
+        self.waveformLoader.request(file_path)
+
+    def waveform_loaded(self, file_path, peaks):
+        if file_path == self.current_file_path:
+            self.musicSlider.set_peaks(peaks)
 
     def update_position(self, position):
         """
         Update the slider and current time label as the song plays.
         """
-        self.musicSlider.setValue(position)
-        current_time = QTime(0, 0, 0).addMSecs(position)
-        self.labelCurrentDuration.setText(current_time.toString("mm:ss"))
+        self.positionThrottle.push(position)
+
+    def show_position(self, position):
+        if not self.musicSlider.isSliderDown():  # Don't pull the handle away while it's being dragged
+            self.musicSlider.setValue(position)
+        second = position // 1000
+        if second != self.shownSecond:  # The label only changes once a second
+            self.shownSecond = second
+            self.labelCurrentDuration.setText(format_time(position))
 
     def update_duration(self, duration):
         """
         Update the slider's range and total duration label when the song starts.
         """
         self.musicSlider.setRange(0, duration)
-        total_duration = QTime(0, 0, 0).addMSecs(duration)
-        self.labelTotalDuration.setText(total_duration.toString("mm:ss"))
+        self.labelTotalDuration.setText(format_time(duration))
 
     def set_position(self, position):
         """
         Seek the media player to the new position when the slider is moved.
         """
-        self.mediaPlayer.setPosition(position)
+        self.playbackEngine.set_position(position)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    app.setApplicationName("PythonMusicPlayer")
+    app.setStyleSheet(APP_STYLESHEET)
+    startup_profiler.checkpoint("QApplication")
     window = MainWindow()
+    startup_profiler.checkpoint("MainWindow")
     window.show()
+    startup_profiler.checkpoint("show")
+    startup_profiler.watch_first_paint(window)
     sys.exit(app.exec_())
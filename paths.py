@@ -0,0 +1,12 @@
+import os
+
+from PyQt5.QtCore import QStandardPaths
+
+
+def user_data_dir():
+    """
+    Return the per-user data directory for the player, creating it if needed.
+    """
+    path = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+    os.makedirs(path, exist_ok=True)
+    return path
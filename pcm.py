@@ -0,0 +1,37 @@
+import numpy as np
+
+# Full scale of signed integer PCM, by sample width in bytes
+FULL_SCALE = {1: 2.0 ** 7, 2: 2.0 ** 15, 3: 2.0 ** 23, 4: 2.0 ** 31}
+
+
+def pcm_to_float(data, sample_width, channels):
+    """
+    Convert interleaved little-endian integer PCM bytes to a (frames, channels) float32 array in [-1, 1).
+
+    8-bit PCM is unsigned as in WAV files, wider samples are signed; 24-bit
+    samples are packed in three bytes.
+    """
+    if sample_width == 1:
+        samples = np.frombuffer(data, np.uint8).astype(np.float32) - 128.0
+    elif sample_width == 3:
+        packed = np.frombuffer(data, np.uint8).reshape(-1, 3).astype(np.int32)
+        # Assemble each sample in the top three bytes of an int32, then shift back down to sign extend it
+        samples = ((packed[:, 0] << 8) | (packed[:, 1] << 16) | (packed[:, 2] << 24)) >> 8
+    else:
+        samples = np.frombuffer(data, f"<i{sample_width}")
+    samples = samples.astype(np.float32) / np.float32(FULL_SCALE[sample_width])
+    return samples.reshape(-1, channels)
+
+
+def float_to_pcm(samples, sample_width):
+    """
+    Convert a float array in [-1, 1] back to interleaved little-endian integer PCM bytes, clipping overs.
+    """
+    scale = FULL_SCALE[sample_width]
+    samples = np.clip(np.rint(np.ravel(samples) * scale), -scale, scale - 1)
+    if sample_width == 1:
+        return (samples + 128).astype(np.uint8).tobytes()
+    if sample_width == 3:
+        samples = samples.astype('<i4')
+        return samples.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return samples.astype(f"<i{sample_width}").tobytes()
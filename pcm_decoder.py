@@ -0,0 +1,94 @@
+import functools
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+from pcm import pcm_to_float
+
+BLOCK_FRAMES = 65536
+
+
+class DecodeError(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_path():
+    # Looked up once per process, callers may ask for every track of a library
+    return shutil.which("ffmpeg")
+
+
+def can_decode(file_path):
+    """
+    Whether decode can read file_path's format here: anything with ffmpeg, otherwise only WAV.
+    """
+    return ffmpeg_path() is not None or file_path.lower().endswith('.wav')
+
+
+def decode(file_path, sample_rate=None, channels=None, block_frames=BLOCK_FRAMES, start=0.0):
+    """
+    Decode an audio file to float PCM; returns (sample_rate, channels, blocks).
+
+    blocks lazily yields (frames, channels) float32 arrays, beginning start
+    seconds into the file. Any format goes through an ffmpeg subprocess,
+    which can also resample and remix to the requested rate and channel
+    count on the way. Without ffmpeg only WAV files can be read; they keep
+    their own sample rate, and channels can only be mixed down to mono.
+    """
+    ffmpeg = ffmpeg_path()
+    if ffmpeg is not None:
+        return _decode_ffmpeg(ffmpeg, file_path, sample_rate or 44100, channels or 2, block_frames, start)
+    if file_path.lower().endswith('.wav'):
+        return _decode_wave(file_path, channels, block_frames, start)
+    raise DecodeError(f"Can't decode {file_path} without ffmpeg")
+
+
+def _decode_ffmpeg(ffmpeg, file_path, sample_rate, channels, block_frames, start):
+    command = [
+        ffmpeg, "-nostdin", "-v", "error", "-ss", f"{start:.3f}", "-i", file_path, "-vn",
+        "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(sample_rate), "-",
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def blocks():
+        block_bytes = block_frames * channels * 4
+        try:
+            while True:
+                data = process.stdout.read(block_bytes)
+                if not data:
+                    break
+                data = data[:len(data) - len(data) % (channels * 4)]  # Only whole frames
+                yield np.frombuffer(data, np.float32).reshape(-1, channels)
+        finally:
+            # Also runs when the consumer stops early, don't leave ffmpeg behind
+            process.kill()
+            process.stdout.close()
+            process.wait()
+
+    return sample_rate, channels, blocks()
+
+
+def _decode_wave(file_path, channels, block_frames, start):
+    try:
+        wave_file = wave.open(file_path, 'rb')
+    except (wave.Error, EOFError) as e:
+        raise DecodeError(f"Can't decode {file_path}: {e}") from e
+    file_channels = wave_file.getnchannels()
+    sample_width = wave_file.getsampwidth()
+    if start > 0:
+        wave_file.setpos(min(int(start * wave_file.getframerate()), wave_file.getnframes()))
+
+    def blocks():
+        with wave_file:
+            while True:
+                data = wave_file.readframes(block_frames)
+                if not data:
+                    break
+                samples = pcm_to_float(data, sample_width, file_channels)
+                if channels == 1 and file_channels > 1:
+                    samples = samples.mean(axis=1, keepdims=True)
+                yield samples
+
+    return wave_file.getframerate(), 1 if channels == 1 else file_channels, blocks()
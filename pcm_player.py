@@ -0,0 +1,266 @@
+import queue
+import threading
+
+from PyQt5.QtCore import QIODevice, QObject, pyqtSignal
+from PyQt5.QtMultimedia import QAudio, QAudioFormat, QAudioOutput, QMediaPlayer
+
+from equalizer import BAND_FREQUENCIES, Equalizer
+from pcm import float_to_pcm
+from pcm_decoder import decode
+
+OUTPUT_SAMPLE_RATE = 44100
+OUTPUT_CHANNELS = 2
+OUTPUT_SAMPLE_WIDTH = 2  # 16-bit, which every output device takes
+BLOCK_FRAMES = 8192
+QUEUED_BLOCKS = 3  # Decoded ahead of the output; also how long a gain change takes to be heard, ~0.5 s
+
+
+class _PcmSource(QIODevice):
+    """
+    Sequential device QAudioOutput pulls the filtered PCM from.
+
+    The decode thread hands over blocks of bytes through a bounded queue; a
+    None block marks the end of the track. Reads never block the GUI thread:
+    when nothing is queued yet they return what there is.
+    """
+
+    def __init__(self, blocks, parent=None):
+        super(_PcmSource, self).__init__(parent)
+        self.blocks = blocks
+        self.buffer = bytearray()
+        self.finished = False
+
+    def isSequential(self):
+        return True
+
+    def at_end(self):
+        return self.finished and not self.buffer
+
+    def readData(self, max_size):
+        while len(self.buffer) < max_size and not self.finished:
+            try:
+                block = self.blocks.get_nowait()
+            except queue.Empty:
+                break
+            if block is None:
+                self.finished = True
+            else:
+                self.buffer += block
+        data = bytes(self.buffer[:max_size])
+        del self.buffer[:max_size]
+        return data
+
+    def writeData(self, data):
+        return -1
+
+
+class PcmPlayer(QObject):
+    """
+    Plays a track by decoding it to PCM and passing every block through the equalizer.
+
+    A decode thread reads the track with pcm_decoder, filters each block
+    with equalizer.Equalizer and queues it as 16-bit PCM for a QAudioOutput
+    in pull mode. Gain changes are handed to the decode thread, which owns
+    the equalizer. Seeking restarts the decode at the new position. The
+    methods and signals mirror the parts of QMediaPlayer that
+    PlaybackEngine uses, with the same state and media status values.
+    """
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    mediaStatusChanged = pyqtSignal(int)
+    stateChanged = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super(PcmPlayer, self).__init__(parent)
+        self.path = None
+        self.gains = None
+        self.volume = 100
+        self.notify_interval = 1000
+        self._state = QMediaPlayer.StoppedState
+        self._status = QMediaPlayer.NoMedia
+        self._duration = 0
+        self._start_ms = 0  # Track position the current decode started at
+        self._output = None
+        self._source = None
+        self._stop = None  # Stop event of the running decode thread
+        self._gains_version = 0  # Bumped on every gain change, the decode thread applies gains when it moves
+
+    def load(self, path, duration=None):
+        """
+        Set the track to play, or clear it with None.
+
+        duration is the track's length in ms as the library knows it, 0 if it
+        isn't known; the file isn't parsed for it on the GUI thread.
+        """
+        self._close()
+        self.path = path
+        self._start_ms = 0
+        self._set_state(QMediaPlayer.StoppedState)
+        if path is None:
+            self._set_status(QMediaPlayer.NoMedia)
+            return
+        self._duration = duration or 0
+        self.durationChanged.emit(self._duration)
+        self._set_status(QMediaPlayer.LoadedMedia)
+
+    def set_gains(self, gains):
+        self.gains = gains
+        self._gains_version += 1
+
+    def play(self):
+        if self.path is None:
+            return
+        if self._status == QMediaPlayer.EndOfMedia:
+            self._close()  # Play again from the start
+            self._start_ms = 0
+        if self._output is None:
+            self._open()
+        if self._output.state() == QAudio.SuspendedState:
+            self._output.resume()
+        else:
+            self._output.start(self._source)
+        self._set_state(QMediaPlayer.PlayingState)
+        self._set_status(QMediaPlayer.BufferedMedia)
+
+    def pause(self):
+        if self.path is None:
+            return
+        if self._output is None:
+            self._open()  # Prerolls: the decode thread fills the queue while paused
+        elif self._output.state() == QAudio.ActiveState or self._output.state() == QAudio.IdleState:
+            self._output.suspend()
+        self._set_state(QMediaPlayer.PausedState)
+
+    def stop(self):
+        self._close()
+        self._start_ms = 0
+        self._set_state(QMediaPlayer.StoppedState)
+
+    def state(self):
+        return self._state
+
+    def mediaStatus(self):
+        return self._status
+
+    def duration(self):
+        return self._duration
+
+    def position(self):
+        if self._output is None:
+            return self._start_ms
+        return self._start_ms + self._output.processedUSecs() // 1000
+
+    def setPosition(self, position):
+        if self.path is None:
+            return
+        playing = self._state == QMediaPlayer.PlayingState
+        self._close()
+        self._start_ms = max(0, position)
+        if self._state != QMediaPlayer.StoppedState:
+            self._open()
+            if playing:
+                self._output.start(self._source)
+        self.positionChanged.emit(self._start_ms)
+
+    def setVolume(self, volume):
+        self.volume = volume
+        if self._output is not None:
+            self._output.setVolume(volume / 100)
+
+    def setNotifyInterval(self, interval):
+        self.notify_interval = interval
+        if self._output is not None:
+            self._output.setNotifyInterval(interval)
+
+    def _open(self):
+        sample_rate, channels, blocks = decode(
+            self.path, OUTPUT_SAMPLE_RATE, OUTPUT_CHANNELS, BLOCK_FRAMES, self._start_ms / 1000
+        )
+        audio_format = QAudioFormat()
+        audio_format.setSampleRate(sample_rate)
+        audio_format.setChannelCount(channels)
+        audio_format.setSampleSize(OUTPUT_SAMPLE_WIDTH * 8)
+        audio_format.setCodec("audio/pcm")
+        audio_format.setByteOrder(QAudioFormat.LittleEndian)
+        audio_format.setSampleType(QAudioFormat.SignedInt)
+
+        queued = queue.Queue(QUEUED_BLOCKS)
+        self._source = _PcmSource(queued, self)
+        self._source.open(QIODevice.ReadOnly)
+        self._output = QAudioOutput(audio_format, self)
+        self._output.setVolume(self.volume / 100)
+        self._output.setNotifyInterval(self.notify_interval)
+        self._output.notify.connect(self._notify)
+        self._output.stateChanged.connect(self._output_state_changed)
+
+        self._stop = threading.Event()
+        equalizer = Equalizer(sample_rate, channels)
+        thread = threading.Thread(target=self._decode, args=(blocks, equalizer, queued, self._stop), daemon=True)
+        thread.start()
+
+    def _close(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+        if self._output is not None:
+            self._output.stateChanged.disconnect(self._output_state_changed)
+            self._output.stop()
+            self._output.deleteLater()
+            self._output = None
+        if self._source is not None:
+            self._source.close()
+            self._source.deleteLater()
+            self._source = None
+
+    def _decode(self, blocks, equalizer, queued, stop):
+        gains_version = None
+        try:
+            for block in blocks:
+                if gains_version != self._gains_version:
+                    gains_version = self._gains_version
+                    equalizer.set_gains(self.gains or [0] * len(BAND_FREQUENCIES))
+                data = float_to_pcm(equalizer.process(block), OUTPUT_SAMPLE_WIDTH)
+                while not stop.is_set():
+                    try:
+                        queued.put(data, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+        except Exception as e:
+            print(f"Error decoding track: {e}")
+        finally:
+            blocks.close()  # Stops ffmpeg if the track was left early
+        while not stop.is_set():
+            try:
+                queued.put(None, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _notify(self):
+        self.positionChanged.emit(self.position())
+
+    def _output_state_changed(self, state):
+        if self._state != QMediaPlayer.PlayingState:
+            return
+        if state == QAudio.ActiveState:
+            self._set_status(QMediaPlayer.BufferedMedia)
+        elif state == QAudio.IdleState:
+            if self._source.at_end():
+                # The output is left to play out what it still holds; the next load or stop closes it
+                self._set_state(QMediaPlayer.StoppedState)
+                self._set_status(QMediaPlayer.EndOfMedia)
+            else:
+                self._set_status(QMediaPlayer.StalledMedia)  # The decoder fell behind, the output waits for it
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            self.stateChanged.emit(state)
+
+    def _set_status(self, status):
+        if status != self._status:
+            self._status = status
+            self.mediaStatusChanged.emit(status)
@@ -0,0 +1,204 @@
+import random
+from array import array
+from collections import deque
+
+QUEUE_FILE_VERSION = 1
+
+
+class PlayQueue:
+    """
+    Play queue with O(1) next/previous, insert-next, append and removal.
+
+    Tracks get an integer id (their position in self.paths). The bulk of the
+    queue is a compact array of ids consumed through a cursor; tracks inserted
+    with insert_next and tracks stepped back over with previous sit in a deque
+    in front of it, and the played tracks are a stack of ids. Removal is a
+    tombstone that next/previous skip.
+
+    Shuffle is a lazy Fisher-Yates: a track is drawn from the unplayed part of
+    the array only when it's needed, and the swaps are kept in a sparse dict,
+    so shuffling a 100k-track queue costs nothing up front. Only the cursor's
+    position is ever drawn ahead of being played (by peek), so remembering
+    that one position is enough to tell a drawn position from one that just
+    received a displaced track.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.clear()
+
+    def clear(self):
+        self.paths.clear()
+        self.order = array('l')  # Ids in queue order
+        self.cursor = 0  # Next position of order to play
+        self.front = deque()  # Ids to play before order[cursor:]
+        self.history = array('l')  # Played ids, most recent last
+        self.current = -1
+        self.removed = set()
+        self.shuffled = False
+        self._swaps = {}  # Sparse Fisher-Yates permutation of order[cursor:]
+        self._drawn_position = -1  # Position of order whose track has been drawn but not played yet
+        self._random = random.Random()
+
+    def __len__(self):
+        return len(self.paths) - len(self.removed)
+
+    def set_tracks(self, paths, start=0):
+        """
+        Replace the queue with paths and make paths[start] the current track.
+
+        In order, the tracks before start become the history so previous steps
+        back through them; shuffled, every other track is left to be drawn.
+        """
+        shuffled = self.shuffled
+        self.clear()
+        self.shuffled = shuffled
+        self.paths.extend(paths)
+        if not self.paths:
+            return
+        self.current = start
+        if shuffled:
+            self.order = array('l', range(len(self.paths)))
+            self.order[start] = self.order[-1]
+            self.order.pop()
+        else:
+            self.history = array('l', range(start))
+            self.order = array('l', range(start + 1, len(self.paths)))
+
+    def current_path(self):
+        return self.paths[self.current] if self.current >= 0 else None
+
+    def append(self, path):
+        self.paths.append(path)
+        self.order.append(len(self.paths) - 1)
+
+    def insert_next(self, path):
+        self.paths.append(path)
+        self.front.appendleft(len(self.paths) - 1)
+
+    def remove(self, track_id):
+        if 0 <= track_id < len(self.paths):
+            self.removed.add(track_id)
+
+    def remove_paths(self, paths):
+        paths = set(paths)
+        for track_id, path in enumerate(self.paths):
+            if path in paths:
+                self.removed.add(track_id)
+
+    def next(self):
+        """
+        Advance to the next track and return its path, or None at the end of the queue.
+        """
+        track_id = self._take_next()
+        if track_id is None:
+            return None
+        if self.current >= 0:
+            self.history.append(self.current)
+        self.current = track_id
+        return self.paths[track_id]
+
+    def peek(self):
+        """
+        Return the path next() would move to, without moving.
+        """
+        while self.front and self.front[0] in self.removed:
+            self.front.popleft()
+        if self.front:
+            return self.paths[self.front[0]]
+        while self.cursor < len(self.order):
+            track_id = self._order_at(self.cursor)
+            if track_id not in self.removed:
+                return self.paths[track_id]
+            self._swaps.pop(self.cursor, None)
+            self.cursor += 1
+        return None
+
+    def previous(self):
+        """
+        Step back to the previously played track and return its path, or None.
+        """
+        while self.history:
+            track_id = self.history.pop()
+            if track_id not in self.removed:
+                if self.current >= 0:
+                    self.front.appendleft(self.current)
+                self.current = track_id
+                return self.paths[track_id]
+        return None
+
+    def set_shuffled(self, shuffled):
+        if shuffled == self.shuffled:
+            return
+        if not shuffled:
+            # Put the unplayed tracks back in queue order
+            remaining = sorted(
+                self.order[self._swaps.get(position, position)] for position in range(self.cursor, len(self.order))
+            )
+            self.order[self.cursor:] = array('l', remaining)
+            self._swaps.clear()
+            self._drawn_position = -1
+        self.shuffled = shuffled
+
+    def _order_at(self, position):
+        if not self.shuffled:
+            return self.order[position]
+        if position != self._drawn_position:
+            # Draw this position's track from the unplayed range, Fisher-Yates style
+            other = self._random.randrange(position, len(self.order))
+            self._swaps[position], self._swaps[other] = (
+                self._swaps.get(other, other), self._swaps.get(position, position)
+            )
+            self._drawn_position = position
+        return self.order[self._swaps[position]]
+
+    def _take_next(self):
+        while self.front:
+            track_id = self.front.popleft()
+            if track_id not in self.removed:
+                return track_id
+        while self.cursor < len(self.order):
+            track_id = self._order_at(self.cursor)
+            self._swaps.pop(self.cursor, None)
+            self.cursor += 1
+            if track_id not in self.removed:
+                return track_id
+        return None
+
+    def state(self):
+        """
+        Return the queue state as plain marshal-friendly values; arrays are stored as raw bytes.
+        """
+        return {
+            'version': QUEUE_FILE_VERSION,
+            'paths': self.paths,
+            'order': self.order.tobytes(),
+            'cursor': self.cursor,
+            'front': list(self.front),
+            'history': self.history.tobytes(),
+            'current': self.current,
+            'removed': list(self.removed),
+            'shuffled': self.shuffled,
+            'swaps': self._swaps,
+            'drawn_position': self._drawn_position,
+        }
+
+    def restore(self, state):
+        """
+        Restore the queue from a state() dict; returns False if it isn't usable.
+        """
+        if not isinstance(state, dict) or state.get('version') != QUEUE_FILE_VERSION:
+            return False
+
+        self.clear()
+        self.paths.extend(state['paths'])
+        self.order.frombytes(state['order'])
+        self.cursor = state['cursor']
+        self.front.extend(state['front'])
+        self.history.frombytes(state['history'])
+        self.current = state['current']
+        self.removed.update(state['removed'])
+        self.shuffled = state['shuffled']
+        self._swaps.update(state['swaps'])
+        self._drawn_position = state.get('drawn_position', -1)  # Absent from queues saved before it was kept
+        return True
@@ -0,0 +1,366 @@
+import enum
+import time
+
+from PyQt5.QtCore import QObject, QUrl, pyqtSignal
+
+# Bound by _load_backend when the first engine is created, so importing this
+# module (e.g. for PlaybackState) doesn't load QtMultimedia and its plugins.
+QMediaContent = QMediaPlayer = None
+
+NOTIFY_INTERVAL = 1000  # ms between position updates, QMediaPlayer's default
+SWITCH_NOTIFY_INTERVAL = 100  # ms between position updates while a track change is being timed
+
+
+def _load_backend():
+    global QMediaContent, QMediaPlayer
+    if QMediaPlayer is None:
+        from PyQt5.QtMultimedia import QMediaContent, QMediaPlayer
+
+
+class PlaybackState(enum.Enum):
+    STOPPED = 'stopped'
+    LOADING = 'loading'
+    PLAYING = 'playing'
+    PAUSED = 'paused'
+    BUFFERING = 'buffering'
+
+
+class AudioPlayer(QObject):
+    """
+    One of the engine's players: a QMediaPlayer, or a PcmPlayer while the equalizer is on.
+
+    QMediaPlayer can't filter what it plays, so while equalizer gains are
+    set, tracks pcm_decoder can read are played by pcm_player.PcmPlayer,
+    which runs every block through the equalizer. Turning the equalizer on
+    moves a loaded track over at its position; turning it off leaves the
+    track where it is (flat gains pass the audio through) until the next
+    load. The signals are passed on from whichever backend holds the track.
+    """
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    mediaStatusChanged = pyqtSignal(int)
+    stateChanged = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super(AudioPlayer, self).__init__(parent)
+        self.media_player = QMediaPlayer(self, QMediaPlayer.StreamPlayback)
+        self.pcm_player = None  # Created when the equalizer is first used, it loads NumPy
+        self.backend = self.media_player
+        self.path = None
+        self.duration_hint = None  # Length of the track in ms as given to load, for PcmPlayer
+        self.gains = None
+        self.volume = 100
+        self.notify_interval = NOTIFY_INTERVAL
+        self._connect(self.media_player)
+
+    def load(self, path, duration=None):
+        """
+        Set the track to play, or clear it with None.
+
+        duration is the track's length in ms if it's known. QMediaPlayer
+        finds it out itself; PcmPlayer reports it as given.
+        """
+        self.path = path
+        self.duration_hint = duration
+        backend = self._backend_for(path)
+        if backend is not self.backend:
+            self._use(backend)
+        if backend is self.media_player:
+            backend.setMedia(QMediaContent(QUrl.fromLocalFile(path)) if path else QMediaContent())
+        else:
+            backend.load(path, duration)
+
+    def set_equalizer(self, gains):
+        """
+        Set the equalizer gains in dB per band, None while flat.
+        """
+        self.gains = gains
+        if self.pcm_player is not None:
+            self.pcm_player.set_gains(gains)
+        if self.backend is self.media_player and self._backend_for(self.path) is not self.media_player:
+            self._switch(self.pcm_player)
+
+    def play(self):
+        self.backend.play()
+
+    def pause(self):
+        self.backend.pause()
+
+    def stop(self):
+        self.backend.stop()
+
+    def state(self):
+        return self.backend.state()
+
+    def mediaStatus(self):
+        return self.backend.mediaStatus()
+
+    def position(self):
+        return self.backend.position()
+
+    def setPosition(self, position):
+        self.backend.setPosition(position)
+
+    def duration(self):
+        return self.backend.duration()
+
+    def setVolume(self, volume):
+        self.volume = volume
+        self.backend.setVolume(volume)
+
+    def setNotifyInterval(self, interval):
+        self.notify_interval = interval
+        self.backend.setNotifyInterval(interval)
+
+    def _backend_for(self, path):
+        if not path or not self.gains:
+            return self.media_player
+        from pcm_decoder import can_decode  # Only needed with the equalizer on, it loads NumPy
+        if not can_decode(path):
+            return self.media_player
+        if self.pcm_player is None:
+            from pcm_player import PcmPlayer
+            self.pcm_player = PcmPlayer(self)
+            self.pcm_player.set_gains(self.gains)
+            self._connect(self.pcm_player)
+        return self.pcm_player
+
+    def _switch(self, backend):
+        # Carry the loaded track over to backend at the same position and state
+        position, state = self.backend.position(), self.backend.state()
+        self._use(backend)
+        backend.load(self.path, self.duration_hint)
+        backend.setPosition(position)
+        if state == QMediaPlayer.PlayingState:
+            backend.play()
+        elif state == QMediaPlayer.PausedState:
+            backend.pause()
+
+    def _use(self, backend):
+        # Release the track held by the current backend and make backend the current one
+        self.backend.stop()
+        if self.backend is self.media_player:
+            self.backend.setMedia(QMediaContent())
+        else:
+            self.backend.load(None)
+        self.backend = backend
+        backend.setVolume(self.volume)
+        backend.setNotifyInterval(self.notify_interval)
+
+    def _connect(self, backend):
+        backend.positionChanged.connect(self._position_changed)
+        backend.durationChanged.connect(self._duration_changed)
+        backend.mediaStatusChanged.connect(self._media_status_changed)
+        backend.stateChanged.connect(self._state_changed)
+
+    def _position_changed(self, position):
+        if self.sender() is self.backend:
+            self.positionChanged.emit(position)
+
+    def _duration_changed(self, duration):
+        if self.sender() is self.backend:
+            self.durationChanged.emit(duration)
+
+    def _media_status_changed(self, status):
+        if self.sender() is self.backend:
+            self.mediaStatusChanged.emit(status)
+
+    def _state_changed(self, state):
+        if self.sender() is self.backend:
+            self.stateChanged.emit(state)
+
+
+class PlaybackEngine(QObject):
+    """
+    Two-player playback engine that preloads the next track for gapless changes.
+
+    While one player plays, the next track is loaded and prerolled
+    (paused at zero) on the standby player. At end of media the standby player
+    is started immediately and the two swap roles, so the next track doesn't
+    pay for opening, probing and buffering the file. The time between end of
+    media and the start of audio on the new track (wall time to its first
+    position update, minus the position it reports) is recorded as the switch
+    latency. Only until then does the new player report its position every
+    SWITCH_NOTIFY_INTERVAL ms; otherwise positions come at QMediaPlayer's
+    default of once a second, so playback doesn't wake the GUI more than needed.
+
+    The engine's state is derived from the active player's state and media
+    status. Pausing and resuming act on the loaded media only; resume never
+    sets the media again or touches the file.
+
+    If a track_gain callable is given, it returns the playback gain in dB of
+    a path (e.g. from its measured loudness). Each player's volume is the
+    user's volume scaled by the gain of the track loaded on it, so a
+    preloaded track starts at its own level without a jump. QMediaPlayer
+    can't go above full volume, so positive gains only work below it.
+    Likewise, a track_duration callable returns a path's duration in ms as
+    the library knows it, for the players that don't find it out themselves.
+
+    Equalizer gains given to set_equalizer apply to both players, see
+    AudioPlayer for how they reach the audio.
+    """
+    stateChanged = pyqtSignal(object)  # PlaybackState
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    trackChanged = pyqtSignal(str)  # Playback moved on to the preloaded track
+    playbackFinished = pyqtSignal()  # End of media with nothing preloaded
+
+    def __init__(self, parent=None, track_gain=None, track_duration=None):
+        super(PlaybackEngine, self).__init__(parent)
+        _load_backend()
+        self.track_gain = track_gain
+        self.track_duration = track_duration
+        self.volume = 100
+        self.players = [AudioPlayer(self), AudioPlayer(self)]
+        self.active = self.players[0]
+        self.current_path = None
+        self.next_path = None
+        self.state = PlaybackState.STOPPED
+        self.switch_latencies_ms = []
+        self._switch_started = None
+
+        for player in self.players:
+            player.positionChanged.connect(self._position_changed)
+            player.durationChanged.connect(self._duration_changed)
+            player.mediaStatusChanged.connect(self._media_status_changed)
+            player.stateChanged.connect(self._player_state_changed)
+
+    @property
+    def standby(self):
+        return self.players[1] if self.active is self.players[0] else self.players[0]
+
+    @property
+    def last_switch_latency_ms(self):
+        return self.switch_latencies_ms[-1] if self.switch_latencies_ms else None
+
+    def play(self, path):
+        """
+        Start playing path from the beginning on the active player.
+        """
+        if path == self.next_path:
+            # Already prerolled on the standby player, take it over
+            self.active.stop()
+            self._swap()
+        else:
+            self.active.load(path, self._duration(path))
+            self._apply_volume(self.active, path)
+        self.current_path = path
+        self.next_path = None
+        self._set_state(PlaybackState.LOADING)
+        self.active.play()
+
+    def set_next(self, path):
+        """
+        Preload path on the standby player so it can start without a gap.
+        """
+        if path == self.next_path:
+            return
+        self.next_path = path
+        standby = self.standby
+        standby.stop()
+        standby.load(path, self._duration(path))
+        if path is None:
+            return
+        self._apply_volume(standby, path)
+        standby.pause()  # Prerolls the decoder and fills its buffers without producing sound
+
+    def pause(self):
+        if self.state in (PlaybackState.PLAYING, PlaybackState.BUFFERING, PlaybackState.LOADING):
+            self.active.pause()
+
+    def resume(self):
+        """
+        Continue from the paused position (or restart a stopped track) without reloading it.
+        """
+        if self.state == PlaybackState.PAUSED or (self.state == PlaybackState.STOPPED and self.current_path):
+            self.active.play()
+
+    def stop(self):
+        self.active.stop()
+
+    def position(self):
+        return self.active.position()
+
+    def set_position(self, position):
+        self.active.setPosition(position)
+
+    def set_equalizer(self, gains):
+        """
+        Set the equalizer gains in dB per band, None while flat.
+        """
+        for player in self.players:
+            player.set_equalizer(gains)
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self._apply_volume(self.active, self.current_path)
+        self._apply_volume(self.standby, self.next_path)
+
+    def _duration(self, path):
+        return self.track_duration(path) if self.track_duration and path else None
+
+    def _apply_volume(self, player, path):
+        gain = self.track_gain(path) if self.track_gain and path else 0.0
+        player.setVolume(max(0, min(100, round(self.volume * 10.0 ** (gain / 20.0)))))  # The volume is linear
+
+    def _swap(self):
+        self.active = self.standby
+        self.durationChanged.emit(self.active.duration())
+        self._update_state()
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.stateChanged.emit(state)
+
+    def _update_state(self):
+        player_state = self.active.state()
+        if player_state == QMediaPlayer.StoppedState:
+            self._set_state(PlaybackState.STOPPED)
+        elif player_state == QMediaPlayer.PausedState:
+            self._set_state(PlaybackState.PAUSED)
+        else:
+            status = self.active.mediaStatus()
+            if status == QMediaPlayer.LoadingMedia:
+                self._set_state(PlaybackState.LOADING)
+            elif status in (QMediaPlayer.BufferingMedia, QMediaPlayer.StalledMedia):
+                self._set_state(PlaybackState.BUFFERING)
+            else:
+                self._set_state(PlaybackState.PLAYING)
+
+    def _player_state_changed(self, player_state):
+        if self.sender() is self.active:
+            self._update_state()
+
+    def _media_status_changed(self, status):
+        if self.sender() is not self.active:
+            return
+        if status != QMediaPlayer.EndOfMedia:
+            self._update_state()
+            return
+        if self.next_path is None:
+            self.playbackFinished.emit()
+            return
+
+        self._switch_started = time.perf_counter()
+        self.standby.setNotifyInterval(SWITCH_NOTIFY_INTERVAL)
+        self.standby.play()
+        self._swap()
+        self.current_path = self.next_path
+        self.next_path = None
+        self.trackChanged.emit(self.current_path)
+
+    def _position_changed(self, position):
+        if self.sender() is not self.active:
+            return
+        if self._switch_started is not None and position > 0:
+            elapsed_ms = (time.perf_counter() - self._switch_started) * 1000
+            self.switch_latencies_ms.append(max(0.0, elapsed_ms - position))
+            del self.switch_latencies_ms[:-100]  # Only keep recent measurements
+            self._switch_started = None
+            self.active.setNotifyInterval(NOTIFY_INTERVAL)
+        self.positionChanged.emit(position)
+
+    def _duration_changed(self, duration):
+        if self.sender() is self.active:
+            self.durationChanged.emit(duration)
@@ -0,0 +1,239 @@
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SEARCH_FIELDS = ('title', 'artist', 'album')
+
+# Letters that don't decompose into a base letter plus accents under NFKD
+TRANSLITERATIONS = str.maketrans({
+    'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ł': 'l', 'đ': 'd', 'ð': 'd', 'þ': 'th', 'ı': 'i', 'ħ': 'h',
+})
+
+FUZZY_THRESHOLD = 0.4  # Minimum trigram similarity for a token to count as a typo match
+FUZZY_TOKENS_PER_TERM = 50
+
+
+def normalize(text):
+    """
+    Fold case, accents and a few special letters so "Björk" and "bjork" compare equal.
+    """
+    if text.isascii():
+        return text.lower()  # Nothing to decompose or transliterate, and the common case
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(character for character in text if not unicodedata.combining(character))
+    return text.translate(TRANSLITERATIONS)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(normalize(text))
+
+
+def trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over track titles, artists and albums.
+
+    Tracks are numbered in the order they are added, which is library order,
+    and each token maps to the ascending array of numbers of the tracks
+    containing it. The distinct tokens are also kept sorted, which lays them
+    out in the order of a prefix trie's leaves: every prefix's subtree is one
+    contiguous slice found with two binary searches. A query matches tracks
+    that have, for each query token, some token starting with it; the arrays
+    are combined in a mask over the track numbers, so even a match of half
+    the library comes back in library order without sorting or hashing paths.
+
+    For typo tolerance, every distinct token is also indexed by its
+    trigrams; fuzzy_search ranks tracks by how closely their tokens resemble
+    the query's. Text is normalized once when a track is added, so queries
+    only pay for normalizing themselves.
+
+    The index is updated incrementally with add_track(s) and remove.
+    """
+
+    def __init__(self):
+        self.postings = {}  # token -> ascending array of track numbers
+        self.tokens = []  # Sorted distinct tokens
+        self.documents = {}  # path -> tokens, so a track can be removed again
+        self.numbers = {}  # path -> track number
+        self.records = []  # Track number -> track record, None once removed
+        self.trigram_tokens = {}  # trigram -> set of tokens containing it
+        self._prefix_cache = {}
+        self._records_array = None  # records as a NumPy array, built on the first search after a change
+
+    def clear(self):
+        self.postings.clear()
+        self.tokens.clear()
+        self.documents.clear()
+        self.numbers = {}  # Replaced rather than cleared, earlier Matches still refer to it
+        self.records = []
+        self.trigram_tokens.clear()
+        self._prefix_cache.clear()
+        self._records_array = None
+
+    def add_track(self, track):
+        self.add_tracks((track,))
+
+    def add_tracks(self, tracks):
+        """
+        Add or replace many tracks; new tokens are merged into the sorted token list in one pass.
+
+        A replaced track keeps its number, and so its place in library order.
+        """
+        new_tokens = []
+        for track in tracks:
+            path = track['path']
+            number = self.numbers.get(path)
+            if number is None:
+                number = self.numbers[path] = len(self.records)
+                self.records.append(track)
+            else:
+                self._remove_tokens(path, number)
+                self.records[number] = track
+            tokens = frozenset(token for field in SEARCH_FIELDS for token in tokenize(track.get(field) or ""))
+            self.documents[path] = tokens
+            for token in tokens:
+                numbers = self.postings.get(token)
+                if numbers is None:
+                    self.postings[token] = numbers = array('i')
+                    new_tokens.append(token)
+                    for trigram in trigrams(token):
+                        self.trigram_tokens.setdefault(trigram, set()).add(token)
+                if numbers and numbers[-1] > number:
+                    insort(numbers, number)
+                else:
+                    numbers.append(number)
+        if new_tokens:
+            # A token can come and go again when a path is replaced within the batch
+            self.tokens.extend(token for token in dict.fromkeys(new_tokens) if token in self.postings)
+            self.tokens.sort()
+        self._prefix_cache.clear()
+        self._records_array = None
+
+    def remove(self, path):
+        number = self.numbers.pop(path, None)
+        if number is None:
+            return
+        self._remove_tokens(path, number)
+        self.records[number] = None  # Numbers aren't reused, the order of the others stays as it is
+        self._prefix_cache.clear()
+        self._records_array = None
+
+    def _remove_tokens(self, path, number):
+        for token in self.documents.pop(path):
+            numbers = self.postings[token]
+            del numbers[bisect_left(numbers, number)]
+            if not numbers:
+                del self.postings[token]
+                position = bisect_left(self.tokens, token)
+                if position < len(self.tokens) and self.tokens[position] == token:
+                    del self.tokens[position]
+                for trigram in trigrams(token):
+                    tokens_with_trigram = self.trigram_tokens[trigram]
+                    tokens_with_trigram.discard(token)
+                    if not tokens_with_trigram:
+                        del self.trigram_tokens[trigram]
+
+    def search(self, query):
+        """
+        Return the Matches of every token of query, or None for an empty query.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return None
+        # Imported here, NumPy stays off the startup path until the first search
+        import numpy as np
+
+        mask = None
+        for token in set(query_tokens):
+            token_mask = np.zeros(len(self.records), dtype=bool)
+            token_mask[self._prefix_matches(token)] = True
+            if mask is None:
+                mask = token_mask
+            else:
+                mask &= token_mask
+        if self._records_array is None:
+            self._records_array = np.empty(len(self.records), dtype=object)
+            self._records_array[:] = self.records
+        return Matches(self._records_array, self.numbers, mask)
+
+    def fuzzy_search(self, query, limit=500):
+        """
+        Return up to limit paths ranked by trigram similarity to the query, best first.
+
+        Each query token is matched against the indexed tokens sharing its
+        trigrams (Dice coefficient); a track scores the best similarity it has
+        for every query token, summed over the query.
+        """
+        scores = Counter()
+        for term in set(tokenize(query)):
+            term_trigrams = trigrams(term)
+            shared = Counter()
+            for trigram in term_trigrams:
+                shared.update(self.trigram_tokens.get(trigram, ()))
+
+            similar = []
+            for token, count in shared.items():
+                similarity = 2 * count / (len(term_trigrams) + len(token))  # A padded token has len(token) trigrams
+                if similarity >= FUZZY_THRESHOLD:
+                    similar.append((similarity, token))
+            similar.sort(reverse=True)
+
+            best = {}
+            for similarity, token in similar[:FUZZY_TOKENS_PER_TERM]:
+                for number in self.postings[token]:
+                    if similarity > best.get(number, 0):
+                        best[number] = similarity
+            scores.update(best)
+
+        return [self.records[number]['path'] for number, _ in scores.most_common(limit)]
+
+    def _prefix_matches(self, prefix):
+        # Numbers of the tracks with a token starting with prefix, unordered and with repeats
+        import numpy as np
+
+        numbers = self._prefix_cache.get(prefix)
+        if numbers is None:
+            start = bisect_left(self.tokens, prefix)
+            end = bisect_left(self.tokens, prefix + '\U0010ffff', start)
+            # Copied out of the arrays, a buffer still exported would keep them from growing
+            numbers = np.concatenate(
+                [np.frombuffer(self.postings[token], dtype=np.intc) for token in self.tokens[start:end]]
+                or [np.empty(0, dtype=np.intc)]
+            )
+            self._prefix_cache[prefix] = numbers
+        return numbers
+
+
+class Matches:
+    """
+    The tracks matching a search, as a mask over the track numbers of the index.
+
+    Holds the index's records as they were at the search: tracks added
+    after it don't match, and tracks changed or removed since keep the
+    record they had.
+    """
+
+    def __init__(self, records, numbers, mask):
+        self._records = records
+        self._numbers = numbers
+        self._mask = mask
+
+    def __len__(self):
+        return int(self._mask.sum())
+
+    def __contains__(self, path):
+        number = self._numbers.get(path)
+        return number is not None and number < len(self._mask) and bool(self._mask[number])
+
+    def tracks(self):
+        """
+        Return the matching track records in library order.
+        """
+        return self._records[self._mask].tolist()
@@ -0,0 +1,76 @@
+import marshal
+import os
+
+from library_index import TRACK_COLUMNS
+
+SESSION_FILE_VERSION = 1
+
+
+class SessionSnapshot:
+    """
+    What the window showed when it was closed, so the next launch can show it again at once.
+
+    The library rows are stored in grid order as tuples of TRACK_COLUMNS
+    values; the whole snapshot is a single marshal blob, which loads far
+    faster than querying and sorting the index. It's only a starting point:
+    the library is revalidated against the disk after the window is up.
+    """
+
+    def __init__(self, folder_path=None, tracks=(), scroll_position=0, queue=None, current_path=None, position=0,
+                 equalizer_gains=None):
+        self.folder_path = folder_path
+        self.tracks = list(tracks)
+        self.scroll_position = scroll_position
+        self.queue = queue  # PlayQueue.state()
+        self.current_path = current_path
+        self.position = position  # Playback position of current_path, in milliseconds
+        self.equalizer_gains = equalizer_gains  # dB per band, None while flat
+
+    def save(self, file_path):
+        # marshal writes a string seen before as a back reference, so sharing the
+        # repeated artist, album and cover hash strings shrinks the file and the
+        # memory of the loaded rows
+        shared = {}
+        rows = [
+            tuple(shared.setdefault(value, value) if isinstance(value, str) else value for value in row)
+            for row in ((track.get(column) for column in TRACK_COLUMNS) for track in self.tracks)
+        ]
+        state = {
+            'version': SESSION_FILE_VERSION,
+            'folder_path': self.folder_path,
+            'columns': TRACK_COLUMNS,
+            'rows': rows,
+            'scroll_position': self.scroll_position,
+            'queue': self.queue,
+            'current_path': self.current_path,
+            'position': self.position,
+            'equalizer_gains': self.equalizer_gains,
+        }
+        temporary_path = f"{file_path}.tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(marshal.dumps(state))
+        os.replace(temporary_path, file_path)
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Read a snapshot from file_path; returns None if there's no usable one.
+        """
+        try:
+            with open(file_path, 'rb') as file:
+                state = marshal.loads(file.read())  # Much faster than marshal.load on the file object
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(state, dict) or state.get('version') != SESSION_FILE_VERSION:
+            return None
+
+        columns = state['columns']
+        return cls(
+            folder_path=state['folder_path'],
+            tracks=[dict(zip(columns, row)) for row in state['rows']],
+            scroll_position=state['scroll_position'],
+            queue=state['queue'],
+            current_path=state['current_path'],
+            position=state['position'],
+            equalizer_gains=state.get('equalizer_gains'),  # Not in snapshots from before the equalizer
+        )
@@ -0,0 +1,203 @@
+"""
+Startup tracing for --profile-startup.
+
+Records how long each startup phase and each module import takes, up to the
+first paint of the main window, then writes a Chrome trace (open it in
+chrome://tracing or https://ui.perfetto.dev) and prints a one-line summary.
+Nothing is recorded unless start() is called, so a normal launch only pays
+for importing this module.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+FLAG = "--profile-startup"
+TRACE_FILE_NAME = "startup-trace.json"
+SLOWEST_IMPORTS = 5
+
+_profiler = None
+
+
+class _TimedLoader:
+    """
+    Wraps a module's loader to time its import; extension modules do most of their work in create_module.
+    """
+
+    def __init__(self, profiler, loader):
+        self.profiler = profiler
+        self.loader = loader
+        self.started = {}
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        self.started[spec.name] = (time.perf_counter(), self.profiler.import_depth)
+        self.profiler.import_depth += 1
+        try:
+            return self.loader.create_module(spec)
+        except BaseException:
+            self.profiler.import_depth -= 1
+            raise
+
+    def exec_module(self, module):
+        name = module.__spec__.name
+        started, depth = self.started.pop(name, (time.perf_counter(), self.profiler.import_depth))
+        self.profiler.import_depth = depth + 1
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler.import_depth = depth
+            self.profiler.add_import(name, started, time.perf_counter(), depth)
+
+
+class _ImportTimer:
+    """
+    Meta path finder that asks the other finders for a spec and swaps in a timed loader.
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._finding = set()
+
+    def find_spec(self, name, path=None, target=None):
+        if name in self._finding or threading.current_thread() is not threading.main_thread():
+            return None
+        self._finding.add(name)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                        spec.loader = _TimedLoader(self.profiler, spec.loader)
+                    return spec
+            return None
+        finally:
+            self._finding.discard(name)
+
+
+class StartupProfiler:
+    def __init__(self, trace_file=None):
+        self.trace_file = trace_file
+        self.origin = time.perf_counter()
+        self.last_checkpoint = self.origin
+        self.events = []
+        self.phases = []  # (name, milliseconds) of the top-level checkpoints, in order
+        self.imports = []  # (milliseconds, name) of imports not nested in another import
+        self.import_depth = 0
+        self.import_timer = _ImportTimer(self)
+        self.finished = False
+        self._first_paint_filter = None
+
+    def _timestamp(self, moment):
+        return (moment - self.origin) * 1e6  # Trace timestamps are in microseconds
+
+    def add_event(self, name, category, started, ended):
+        self.events.append({
+            'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': 1,
+            'ts': self._timestamp(started), 'dur': (ended - started) * 1e6,
+        })
+
+    def add_import(self, name, started, ended, depth):
+        self.add_event(f"import {name}", 'import', started, ended)
+        if depth == 0:
+            self.imports.append(((ended - started) * 1000, name))
+
+    def checkpoint(self, name):
+        now = time.perf_counter()
+        self.add_event(name, 'phase', self.last_checkpoint, now)
+        self.phases.append((name, (now - self.last_checkpoint) * 1000))
+        self.last_checkpoint = now
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        self.checkpoint("first paint")
+        self.events.append({
+            'name': "first frame", 'cat': 'phase', 'ph': 'i', 's': 'g', 'pid': os.getpid(), 'tid': 1,
+            'ts': self._timestamp(time.perf_counter()),
+        })
+        if self.import_timer in sys.meta_path:
+            sys.meta_path.remove(self.import_timer)
+
+        trace_file = self.trace_file
+        if trace_file is None:
+            from paths import user_data_dir
+            trace_file = os.path.join(user_data_dir(), TRACE_FILE_NAME)
+        try:
+            import json
+            with open(trace_file, 'w') as file:
+                json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, file)
+        except OSError as e:
+            print(f"Error writing startup trace: {e}")
+        print(self.summary(trace_file))
+
+    def summary(self, trace_file):
+        total = sum(milliseconds for _, milliseconds in self.phases)
+        phases = ", ".join(f"{name} {milliseconds:.1f}" for name, milliseconds in self.phases)
+        slowest = ", ".join(f"{name} {milliseconds:.1f}" for milliseconds, name in sorted(self.imports, reverse=True)[:SLOWEST_IMPORTS])
+        return f"Startup: first paint after {total:.1f} ms ({phases}); slowest imports: {slowest}; trace: {trace_file}"
+
+
+def start(argv):
+    """
+    Start profiling if argv asks for it (--profile-startup or --profile-startup=FILE).
+
+    Call this before the imports that should be timed.
+    """
+    global _profiler
+    for argument in argv:
+        if argument == FLAG or argument.startswith(FLAG + "="):
+            _profiler = StartupProfiler(argument.partition("=")[2] or None)
+            sys.meta_path.insert(0, _profiler.import_timer)
+            return True
+    return False
+
+
+def checkpoint(name):
+    """
+    Record the time since the previous checkpoint (or the start) as the phase name.
+    """
+    if _profiler is not None and not _profiler.finished:
+        _profiler.checkpoint(name)
+
+
+@contextmanager
+def phase(name):
+    """
+    Record the enclosed block as a nested phase.
+    """
+    if _profiler is None or _profiler.finished:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profiler.add_event(name, 'phase', started, time.perf_counter())
+
+
+def watch_first_paint(window):
+    """
+    Finish the trace once window has painted for the first time.
+    """
+    if _profiler is None:
+        return
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+    from PyQt5.QtWidgets import QApplication, QWidget
+
+    class FirstPaintFilter(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint and isinstance(watched, QWidget) and watched.window() is window:
+                QApplication.instance().removeEventFilter(self)
+                # Let the rest of the frame paint before taking the time
+                QTimer.singleShot(0, _profiler.finish)
+            return False
+
+    _profiler._first_paint_filter = FirstPaintFilter()
+    QApplication.instance().installEventFilter(_profiler._first_paint_filter)
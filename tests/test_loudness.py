@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from loudness import ANALYSIS_SAMPLE_RATE, LoudnessMeter, gated_loudness
+
+
+def sine(dbfs, seconds, sample_rate=ANALYSIS_SAMPLE_RATE, frequency=1000.0):
+    # Stereo, the same signal in both channels, peak at dbfs
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    wave = (10.0 ** (dbfs / 20.0) * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+    return np.stack((wave, wave), axis=1)
+
+
+def measure(*segments):
+    meter = LoudnessMeter(ANALYSIS_SAMPLE_RATE, 2)
+    for dbfs, seconds in segments:
+        signal = sine(dbfs, seconds)
+        for start in range(0, len(signal), 65536):
+            meter.process(signal[start:start + 65536])
+    return meter.loudness()
+
+
+def test_relative_gate_is_10_lu_below_the_absolutely_gated_loudness():
+    # Both levels pass the gate at 10 LU below their joint loudness: -0.691 + 10 log10(0.53)
+    assert gated_loudness([1.0] * 10 + [0.06] * 10) == pytest.approx(-3.448, abs=0.001)
+    # Ten times quieter than that gate is left out
+    assert gated_loudness([1.0] * 10 + [0.005] * 10) == pytest.approx(-0.691, abs=0.001)
+
+
+def test_ebu_tech_3341_case_1_stereo_sine_at_minus_23_dbfs():
+    assert measure((-23, 20)) == pytest.approx(-23.0, abs=0.1)
+
+
+def test_ebu_tech_3341_case_3_quiet_parts_are_gated_out():
+    assert measure((-36, 10), (-23, 60), (-36, 10)) == pytest.approx(-23.0, abs=0.1)
+
+
+def test_ebu_tech_3341_case_5_short_loud_part():
+    assert measure((-26, 20), (-20, 20.1), (-26, 20)) == pytest.approx(-23.0, abs=0.1)
+
+
+def test_silence_has_no_loudness():
+    assert gated_loudness(np.zeros(10)) is None
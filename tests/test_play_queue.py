@@ -0,0 +1,44 @@
+import itertools
+from collections import Counter
+
+from play_queue import PlayQueue
+
+
+def play_through(queue, peek=False):
+    played = []
+    while True:
+        if peek:
+            expected = queue.peek()
+        path = queue.next()
+        if peek:
+            assert path == expected
+        if path is None:
+            return ''.join(played)
+        played.append(path)
+
+
+def test_shuffle_draws_every_order_equally_often():
+    trials = 30000
+    orders = Counter()
+    for trial in range(trials):
+        queue = PlayQueue()
+        queue.set_shuffled(True)
+        queue.set_tracks(list('abcd'))
+        queue._random.seed(trial)
+        orders[play_through(queue, peek=trial % 2 == 0)] += 1
+
+    expected = {''.join(order) for order in itertools.permutations('bcd')}
+    assert set(orders) == expected
+    for count in orders.values():
+        # Each order is a binomial draw with p = 1/6: one standard deviation is about 65
+        assert abs(count - trials / 6) < 500
+
+
+def test_unshuffling_keeps_the_unplayed_tracks():
+    queue = PlayQueue()
+    queue.set_shuffled(True)
+    queue.set_tracks(list('abcdef'))
+    first = queue.next()
+    queue.peek()
+    queue.set_shuffled(False)
+    assert play_through(queue) == ''.join(sorted(set('bcdef') - {first}))
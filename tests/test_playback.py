@@ -0,0 +1,157 @@
+import wave
+
+import pytest
+from PyQt5.QtCore import QObject, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+
+import playback
+
+
+class FakeMediaContent:
+    def __init__(self, url=None):
+        self.url = url
+
+
+class FakeMediaPlayer(QObject):
+    """
+    Stands in for QMediaPlayer: records setMedia calls and follows play, pause and stop.
+    """
+    StreamPlayback = 2
+    StoppedState, PlayingState, PausedState = range(3)
+    (UnknownMediaStatus, NoMedia, LoadingMedia, LoadedMedia, StalledMedia, BufferingMedia, BufferedMedia,
+     EndOfMedia, InvalidMedia) = range(9)
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    mediaStatusChanged = pyqtSignal(int)
+    stateChanged = pyqtSignal(int)
+    media_set = []
+
+    def __init__(self, parent=None, flags=0):
+        super(FakeMediaPlayer, self).__init__(parent)
+        self._state = self.StoppedState
+        self._status = self.NoMedia
+        self.notify_interval = 1000
+
+    def setMedia(self, content):
+        FakeMediaPlayer.media_set.append(content.url)
+        self._set(self.StoppedState, self.LoadedMedia if content.url else self.NoMedia)
+
+    def play(self):
+        self._set(self.PlayingState, self.BufferedMedia)
+
+    def pause(self):
+        self._set(self.PausedState, self._status)
+
+    def stop(self):
+        self._set(self.StoppedState, self._status)
+
+    def state(self):
+        return self._state
+
+    def mediaStatus(self):
+        return self._status
+
+    def position(self):
+        return 0
+
+    def duration(self):
+        return 0
+
+    def setPosition(self, position):
+        pass
+
+    def setVolume(self, volume):
+        pass
+
+    def setNotifyInterval(self, interval):
+        self.notify_interval = interval
+
+    def _set(self, state, status):
+        if status != self._status:
+            self._status = status
+            self.mediaStatusChanged.emit(status)
+        if state != self._state:
+            self._state = state
+            self.stateChanged.emit(state)
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(playback, "QMediaPlayer", FakeMediaPlayer)
+    monkeypatch.setattr(playback, "QMediaContent", FakeMediaContent)
+    FakeMediaPlayer.media_set.clear()
+    app = QApplication.instance() or QApplication([])
+    app.setApplicationName("PythonMusicPlayerTests")
+
+    import main
+    window = main.MainWindow()
+    yield window
+    QThreadPool.globalInstance().waitForDone()  # The waveform loader still reports to the window
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+
+
+@pytest.fixture
+def track_path(tmp_path):
+    path = str(tmp_path / "track.wav")
+    with wave.open(path, 'wb') as wave_file:
+        wave_file.setnchannels(1)
+        wave_file.setsampwidth(2)
+        wave_file.setframerate(8000)
+        wave_file.writeframes(b'\0\0' * 8000)
+    return path
+
+
+def test_resume_does_not_open_the_file_again(window, track_path, monkeypatch):
+    import main
+    reads = []
+    read_track_info = main.read_track_info
+    monkeypatch.setattr(main, "read_track_info", lambda path: reads.append(path) or read_track_info(path))
+
+    window.play_song(track_path)
+    assert window.playbackEngine.state == playback.PlaybackState.PLAYING
+    reads.clear()  # Showing the track's tags when it starts is expected
+
+    window.toggle_play_pause()
+    assert window.playbackEngine.state == playback.PlaybackState.PAUSED
+    window.toggle_play_pause()
+    assert window.playbackEngine.state == playback.PlaybackState.PLAYING
+
+    assert [url.toLocalFile() for url in FakeMediaPlayer.media_set] == [track_path]
+    assert reads == []
+
+
+def test_position_updates_are_only_frequent_around_a_switch(monkeypatch):
+    monkeypatch.setattr(playback, "QMediaPlayer", FakeMediaPlayer)
+    monkeypatch.setattr(playback, "QMediaContent", FakeMediaContent)
+    engine = playback.PlaybackEngine()
+    first, second = (player.backend for player in engine.players)
+    engine.play("/music/a.flac")
+    engine.set_next("/music/b.flac")
+    assert first.notify_interval == second.notify_interval == playback.NOTIFY_INTERVAL
+
+    first._set(first.StoppedState, first.EndOfMedia)
+    assert engine.current_path == "/music/b.flac"
+    assert second.notify_interval == playback.SWITCH_NOTIFY_INTERVAL
+
+    second.positionChanged.emit(40)
+    assert engine.last_switch_latency_ms is not None
+    assert second.notify_interval == playback.NOTIFY_INTERVAL
+
+
+def test_players_get_the_duration_the_library_knows(monkeypatch):
+    monkeypatch.setattr(playback, "QMediaPlayer", FakeMediaPlayer)
+    monkeypatch.setattr(playback, "QMediaContent", FakeMediaContent)
+    loads = []
+    load = playback.AudioPlayer.load
+    monkeypatch.setattr(playback.AudioPlayer, "load",
+                        lambda player, path, duration=None: loads.append((path, duration)) or load(player, path, duration))
+    engine = playback.PlaybackEngine(track_duration={"/music/a.flac": 180000}.get)
+
+    engine.play("/music/a.flac")
+    engine.set_next("/music/b.flac")
+    engine.set_next(None)
+    assert loads == [("/music/a.flac", 180000), ("/music/b.flac", None), (None, None)]
@@ -0,0 +1,62 @@
+from library_view import TrackListModel
+from search_index import SearchIndex
+
+
+def track(path, title, artist="Various", album=""):
+    return {'path': path, 'title': title, 'artist': artist, 'album': album}
+
+
+def paths(tracks):
+    return [track['path'] for track in tracks]
+
+
+def test_matches_come_back_in_library_order():
+    tracks = [track(f"/music/{number:02d}.flac", title) for number, title in
+              enumerate(["Love Song", "Blue", "Lovely Day", "Lost", "Lullaby", "Alone"])]
+    index = SearchIndex()
+    index.add_tracks(tracks[:3])
+    index.add_tracks(tracks[3:])
+
+    matches = index.search("lo")
+    assert paths(matches.tracks()) == ["/music/00.flac", "/music/02.flac", "/music/03.flac"]
+    assert len(matches) == 3
+    assert "/music/03.flac" in matches and "/music/01.flac" not in matches
+    assert paths(index.search("l various").tracks()) == ["/music/00.flac", "/music/02.flac", "/music/03.flac",
+                                                         "/music/04.flac"]
+    assert not index.search("love blue")
+    assert index.search("  ") is None
+
+
+def test_replaced_track_keeps_its_place_and_removed_track_goes():
+    index = SearchIndex()
+    index.add_tracks([track("/a.flac", "Lost"), track("/b.flac", "Lost"), track("/c.flac", "Lost")])
+    index.add_tracks([track("/a.flac", "Found"), track("/a.flac", "Lost Again")])
+    index.remove("/b.flac")
+
+    matches = index.search("lost")
+    assert paths(matches.tracks()) == ["/a.flac", "/c.flac"]
+    assert matches.tracks()[0]['title'] == "Lost Again"
+    assert not index.search("found")
+    assert index.fuzzy_search("losst") == ["/a.flac", "/c.flac"]
+
+
+def test_model_shows_matches_of_its_own_library():
+    tracks = [track("/a.flac", "Lost"), track("/b.flac", "Blue"), track("/c.flac", "Lost")]
+    index = SearchIndex()
+    index.add_tracks(tracks)
+    model = TrackListModel()
+    model.set_tracks(tracks)
+
+    model.set_filter(index.search("lost"))
+    assert paths(model.tracks) == ["/a.flac", "/c.flac"]
+    model.append_tracks([track("/d.flac", "Lost")])  # Not searched for yet
+    assert paths(model.tracks) == ["/a.flac", "/c.flac"]
+
+    model.apply_changes([track("/c.flac", "Lost Remix")], ["/a.flac"])
+    assert paths(model.tracks) == ["/c.flac"]
+    assert model.tracks[0]['title'] == "Lost Remix"
+
+    model.set_filter(["/d.flac", "/b.flac"])
+    assert paths(model.tracks) == ["/d.flac", "/b.flac"]
+    model.set_filter(None)
+    assert paths(model.tracks) == ["/b.flac", "/c.flac", "/d.flac"]
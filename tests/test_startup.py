@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+# Backends the window must not load before it first paints, see main.py
+HEAVY_MODULES = ('mutagen', 'PyQt5.QtMultimedia', 'multiprocessing', 'concurrent.futures', 'numpy')
+
+FIRST_PAINT_SCRIPT = """
+import json
+import sys
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication, QWidget
+
+app = QApplication(sys.argv)
+app.setApplicationName("PythonMusicPlayerTests")
+import main
+window = main.MainWindow()
+
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and isinstance(watched, QWidget) and watched.window() is window:
+            app.removeEventFilter(self)
+            print(json.dumps([name for name in sys.argv[1:] if name in sys.modules]))
+            QTimer.singleShot(0, app.quit)
+        return False
+
+
+first_paint = FirstPaint()
+app.installEventFilter(first_paint)
+window.show()
+app.exec_()
+"""
+
+
+def test_heavy_modules_are_not_loaded_before_first_paint(tmp_path):
+    repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(
+        os.environ, QT_QPA_PLATFORM="offscreen",
+        XDG_DATA_HOME=str(tmp_path / "data"), XDG_CACHE_HOME=str(tmp_path / "cache"),
+    )
+    # A fresh interpreter, the test session itself has imported plenty
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_PAINT_SCRIPT] + list(HEAVY_MODULES),
+        cwd=repository, env=environment, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,84 @@
+import hashlib
+import io
+import marshal
+import os
+import re
+import sys
+
+from PyQt5.QtCore import PYQT_VERSION_STR
+
+from paths import user_data_dir
+
+# Resources are registered from the .rcc file at startup, so the generated
+# "import music_rc" lines are dropped rather than pointing at a module that
+# no longer exists.
+RESOURCE_IMPORT = re.compile(r"^import \w+_rc\n", re.MULTILINE)
+
+
+def ui_cache_dir():
+    directory = os.path.join(user_data_dir(), "ui_cache")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def compile_ui(ui_file):
+    """
+    Generate the Python source for ui_file with pyuic and compile it to a code object.
+    """
+    from PyQt5.uic import compileUi  # Only needed when the cache is cold
+
+    source = io.StringIO()
+    compileUi(ui_file, source)
+    return compile(RESOURCE_IMPORT.sub("", source.getvalue()), ui_file, 'exec')
+
+
+def compiled_ui(ui_file, directory=None):
+    """
+    Return the code object generated from ui_file, compiling and caching it first if needed.
+
+    The cache file is named after the hash of the .ui file, the Python
+    version (marshalled code is version specific) and the PyQt version (the
+    generated code is pyuic's), so editing the .ui file or upgrading either
+    yields a new entry and a stale one is never loaded.
+    """
+    with open(ui_file, 'rb') as file:
+        ui_hash = hashlib.sha1(file.read()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(ui_file))[0]
+    cache_name = f"{name}.{ui_hash}.{sys.implementation.cache_tag}.pyqt{PYQT_VERSION_STR}.bin"
+    cache_path = os.path.join(directory or ui_cache_dir(), cache_name)
+    try:
+        with open(cache_path, 'rb') as file:
+            return marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    code = compile_ui(ui_file)
+    temporary_path = f"{cache_path}.tmp"
+    with open(temporary_path, 'wb') as file:
+        marshal.dump(code, file)
+    os.replace(temporary_path, cache_path)
+    return code
+
+
+def load_ui(ui_file, widget):
+    """
+    Build the widgets described by ui_file on widget, like uic.loadUi but from cached generated code.
+
+    After the first run this neither imports uic nor parses the XML; it runs
+    the pyuic output for the .ui file, which constructs the widgets directly.
+    """
+    try:
+        namespace = {}
+        exec(compiled_ui(ui_file), namespace)
+        form_class = next(value for key, value in namespace.items() if key.startswith("Ui_"))
+        form = form_class()
+        form.setupUi(widget)
+    except Exception as e:
+        print(f"Error loading compiled UI, falling back to loadUi: {e}")
+        from PyQt5.uic import loadUi
+        loadUi(ui_file, widget)
+        return
+
+    # loadUi exposes the child widgets as attributes of the widget itself
+    for key, value in vars(form).items():
+        setattr(widget, key, value)
@@ -0,0 +1,46 @@
+from PyQt5.QtCore import QElapsedTimer, QObject, QTimer
+
+
+class UpdateThrottle(QObject):
+    """
+    Coalesces a stream of values into calls of callback, at most fps times a second.
+
+    A value pushed after a quiet frame is delivered at once, so a seek shows
+    up without delay. Values pushed within a frame of the last delivery are
+    merged: only the latest is kept and delivered when the frame is up.
+    """
+
+    def __init__(self, callback, fps, parent=None):
+        super(UpdateThrottle, self).__init__(parent)
+        self.callback = callback
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.clock = QElapsedTimer()
+        self.set_fps(fps)
+        self._pending = False
+        self._value = None
+
+    def set_fps(self, fps):
+        self.interval_ms = max(1, round(1000 / fps))
+
+    def push(self, value):
+        self._value = value
+        self._pending = True
+        if self.timer.isActive():
+            return
+        elapsed = self.clock.elapsed() if self.clock.isValid() else self.interval_ms
+        if elapsed >= self.interval_ms:
+            self.flush()
+        else:
+            self.timer.start(self.interval_ms - elapsed)
+
+    def flush(self):
+        """
+        Deliver the latest value now if there is one waiting.
+        """
+        self.timer.stop()
+        if self._pending:
+            self._pending = False
+            self.clock.start()
+            self.callback(self._value)
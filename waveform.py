@@ -0,0 +1,92 @@
+import hashlib
+import os
+
+import numpy as np
+
+from paths import user_data_dir
+from pcm_decoder import decode
+
+WAVEFORM_BINS = 2048
+WAVEFORM_SAMPLE_RATE = 11025  # Plenty for the outline of a seek bar, and decodes fast
+HOP_FRAMES = 64  # Peaks are first taken over hops this long, then merged into the bins
+
+
+def compute_peaks(file_path, bins=WAVEFORM_BINS):
+    """
+    Decode file_path to mono and return a (bins, 2) float32 array of the min and max sample in each bin.
+
+    The length isn't known until the decode is done, so every block is first
+    reduced to per-hop peaks with a reshape and a min/max over one axis; the
+    hops are merged into the bins at the end.
+    """
+    _, _, blocks = decode(file_path, WAVEFORM_SAMPLE_RATE, 1)
+    minima, maxima = [], []
+    leftover = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        samples = np.concatenate((leftover, block[:, 0]))
+        whole = len(samples) - len(samples) % HOP_FRAMES
+        hops = samples[:whole].reshape(-1, HOP_FRAMES)
+        minima.append(hops.min(axis=1))
+        maxima.append(hops.max(axis=1))
+        leftover = samples[whole:]
+    if len(leftover):
+        minima.append(leftover.min(keepdims=True))
+        maxima.append(leftover.max(keepdims=True))
+    if not minima:
+        return np.zeros((0, 2), dtype=np.float32)
+
+    minima = np.concatenate(minima)
+    maxima = np.concatenate(maxima)
+    # Bin boundaries over the hops; short tracks get fewer bins than asked for
+    starts = np.unique(np.linspace(0, len(minima), min(bins, len(minima)), endpoint=False).astype(np.int64))
+    return np.stack((np.minimum.reduceat(minima, starts), np.maximum.reduceat(maxima, starts)), axis=1)
+
+
+class WaveformCache:
+    """
+    On-disk cache of waveform peaks, one .npy file per track version.
+
+    Files are keyed by the hash of the track's path, modification time and
+    size, so an edited file gets a new entry instead of a stale waveform.
+    """
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = os.path.join(user_data_dir(), "waveforms")
+        self.directory = directory
+
+    def path(self, file_path, mtime, size):
+        key = hashlib.sha1(f"{file_path}\0{mtime}\0{size}".encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def load(self, file_path, mtime, size):
+        try:
+            return np.load(self.path(file_path, mtime, size))
+        except (OSError, ValueError):
+            return None
+
+    def store(self, file_path, mtime, size, peaks):
+        path = self.path(file_path, mtime, size)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = f"{path}.tmp"
+            with open(temporary_path, 'wb') as file:
+                np.save(file, peaks)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            print(f"Error caching waveform: {e}")
+
+    def peaks(self, file_path):
+        """
+        Return the cached peaks of file_path, computing and caching them first if needed.
+
+        No peaks (the decoder produced nothing, e.g. ffmpeg failed on the
+        file) aren't cached, so the next request tries again.
+        """
+        stat = os.stat(file_path)
+        peaks = self.load(file_path, stat.st_mtime_ns, stat.st_size)
+        if peaks is None or not len(peaks):  # Empty entries may have been cached by an earlier version
+            peaks = compute_peaks(file_path)
+            if len(peaks):
+                self.store(file_path, stat.st_mtime_ns, stat.st_size, peaks)
+        return peaks
@@ -0,0 +1,167 @@
+import os
+
+from PyQt5.QtCore import QLineF, QObject, QRectF, QRunnable, Qt, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QPen, QPixmap
+from PyQt5.QtWidgets import QAbstractSlider, QSizePolicy, QSlider, QStyle
+
+from paths import user_data_dir
+
+PLAYED_COLOR = QColor("#0d6efd")
+UNPLAYED_COLOR = QColor("#5b605f")
+GROOVE_COLOR = QColor("#212423")
+GROOVE_HEIGHT = 8
+WAVEFORM_HEIGHT = 36
+
+
+class _WaveformTask(QRunnable):
+    def __init__(self, loader, file_path):
+        super(_WaveformTask, self).__init__()
+        self.loader = loader
+        self.file_path = file_path
+
+    def run(self):
+        self.loader.load(self.file_path)
+
+
+class WaveformLoader(QObject):
+    """
+    Computes or loads waveform peaks on worker threads.
+
+    The peaks come back through waveformReady as a list of (minimum, maximum)
+    pairs, empty if the track couldn't be decoded. NumPy and the decoder are
+    only imported on the worker, the first time a waveform is needed.
+    """
+    waveformReady = pyqtSignal(str, list)
+    PRIORITY = 1 << 30  # Ahead of queued cover loads, the seek bar of the playing track is in view
+
+    def __init__(self, parent=None):
+        super(WaveformLoader, self).__init__(parent)
+        self.directory = os.path.join(user_data_dir(), "waveforms")
+        self.pool = QThreadPool.globalInstance()
+        self._pending = set()
+        self.waveformReady.connect(self._finished)
+
+    def request(self, file_path):
+        if file_path in self._pending:
+            return
+        self._pending.add(file_path)
+        self.pool.start(_WaveformTask(self, file_path), self.PRIORITY)
+
+    def load(self, file_path):
+        peaks = []
+        try:
+            from waveform import WaveformCache
+            peaks = WaveformCache(self.directory).peaks(file_path).tolist()
+        except Exception as e:
+            print(f"Error computing waveform: {e}")
+        self.waveformReady.emit(file_path, peaks)
+
+    def _finished(self, file_path, peaks):
+        self._pending.discard(file_path)
+
+
+class WaveformSlider(QSlider):
+    """
+    Horizontal seek slider that draws the track's waveform, the played part highlighted.
+
+    The waveform is rendered once per size into a played and an unplayed
+    pixmap, so a position update only blits the two halves. Until the peaks
+    are known it draws a plain groove. A value change that doesn't move the
+    split by a whole pixel isn't repainted at all. Pressing anywhere seeks
+    there, and dragging keeps seeking, through the usual sliderMoved signal.
+    """
+
+    def __init__(self, parent=None):
+        super(WaveformSlider, self).__init__(Qt.Horizontal, parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setFixedHeight(WAVEFORM_HEIGHT)
+        self.peaks = []
+        self._pixmaps = None  # (played, unplayed) at the current size
+        self._painted_split = None  # Split position of the last paint, in pixels
+
+    def set_peaks(self, peaks):
+        self.peaks = peaks or []
+        self._pixmaps = None
+        self.update()
+
+    def resizeEvent(self, event):
+        self._pixmaps = None
+        super(WaveformSlider, self).resizeEvent(event)
+
+    def _split(self):
+        return QStyle.sliderPositionFromValue(self.minimum(), self.maximum(), self.value(), self.width())
+
+    def sliderChange(self, change):
+        if change == QAbstractSlider.SliderValueChange and self._split() == self._painted_split:
+            return  # Nothing visible changed, at a few minutes per track this skips most position updates
+        super(WaveformSlider, self).sliderChange(change)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        split = self._painted_split = self._split()
+        if not self.peaks:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            groove = QRectF(0, (self.height() - GROOVE_HEIGHT) / 2, self.width(), GROOVE_HEIGHT)
+            painter.setBrush(GROOVE_COLOR)
+            painter.drawRoundedRect(groove, GROOVE_HEIGHT / 2, GROOVE_HEIGHT / 2)
+            if split > 0:
+                painter.setBrush(PLAYED_COLOR)
+                painter.drawRoundedRect(groove.adjusted(0, 0, split - self.width(), 0), GROOVE_HEIGHT / 2, GROOVE_HEIGHT / 2)
+            return
+
+        if self._pixmaps is None:
+            lines = self._waveform_lines()
+            self._pixmaps = (self._render(lines, PLAYED_COLOR), self._render(lines, UNPLAYED_COLOR))
+        played, unplayed = self._pixmaps
+        ratio = played.devicePixelRatio()  # Source rectangles are in the pixmap's own pixels
+        height = self.height()
+        painter.drawPixmap(QRectF(0, 0, split, height), played, QRectF(0, 0, split * ratio, height * ratio))
+        painter.drawPixmap(
+            QRectF(split, 0, self.width() - split, height), unplayed,
+            QRectF(split * ratio, 0, (self.width() - split) * ratio, height * ratio),
+        )
+
+    def _waveform_lines(self):
+        # One vertical line per pixel column, spanning the peaks of the bins under it
+        width = self.width()
+        middle = self.height() / 2
+        count = len(self.peaks)
+        scale = (middle - 1) / (max(max(-low, high) for low, high in self.peaks) or 1.0)
+        lines = []
+        for x in range(width):
+            start = x * count // width
+            column = self.peaks[start:max(start + 1, (x + 1) * count // width)]
+            low = min(peak[0] for peak in column)
+            high = max(peak[1] for peak in column)
+            lines.append(QLineF(x + 0.5, middle - high * scale, x + 0.5, middle - low * scale + 1))
+        return lines
+
+    def _render(self, lines, color):
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setPen(QPen(color, 1))
+        painter.drawLines(lines)
+        painter.end()
+        return pixmap
+
+    def _seek_to(self, x):
+        self.setSliderPosition(QStyle.sliderValueFromPosition(self.minimum(), self.maximum(), x, self.width()))
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.LeftButton:
+            return super(WaveformSlider, self).mousePressEvent(event)
+        self.setSliderDown(True)  # While down, slider position changes emit sliderMoved
+        self._seek_to(event.x())
+
+    def mouseMoveEvent(self, event):
+        if self.isSliderDown():
+            self._seek_to(event.x())
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self.isSliderDown():
+            self._seek_to(event.x())
+            self.setSliderDown(False)